@@ -0,0 +1,114 @@
+"""Compare member-cache memory use across gateway policies.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.member_cache --members 100000
+
+Each policy builds a discord.py connection state with its intents and
+MemberCacheFlags, then feeds it a synthetic GUILD_CREATE the way the
+gateway would deliver it under that policy. Memory is measured with
+tracemalloc, so only Python allocations made by the guild are counted.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import discord
+
+GUILD_ID = 1_000_000
+
+def member_payload(user_id: int) -> dict:
+    return {
+        'user': {
+            'id': str(user_id),
+            'username': f"user{user_id}",
+            'global_name': f"User {user_id}",
+            'discriminator': '0',
+            'avatar': None
+        },
+        'nick': f"nick{user_id}" if user_id % 5 == 0 else None,
+        'roles': [str(GUILD_ID + 1 + user_id % 20)],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0
+    }
+
+def presence_payload(user_id: int) -> dict:
+    return {
+        'user': {'id': str(user_id)},
+        'status': 'online',
+        'client_status': {'desktop': 'online'},
+        'activities': [{'name': 'Something', 'type': 0, 'created_at': 0}]
+    }
+
+def guild_payload(member_ids, presence_ids) -> dict:
+    return {
+        'id': str(GUILD_ID),
+        'name': 'Synthetic Guild',
+        'owner_id': '1',
+        'member_count': len(member_ids),
+        'large': True,
+        'roles': [
+            {'id': str(GUILD_ID + i), 'name': f"role{i}", 'permissions': '0', 'position': i,
+             'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}
+            for i in range(21)
+        ],
+        'channels': [],
+        'members': [member_payload(user_id) for user_id in member_ids],
+        'presences': [presence_payload(user_id) for user_id in presence_ids],
+        'voice_states': []
+    }
+
+def build_policies():
+    everything = discord.Intents.all()
+    lazy = discord.Intents.default()
+    lazy.members = True
+    lazy.message_content = True
+
+    return {
+        # Old setup: all intents, full cache, every guild chunked at startup
+        'all-intents, chunked': (everything, discord.MemberCacheFlags.from_intents(everything), True),
+        # New default: no presences; large guilds start with a partial member list
+        'members, lazy chunk': (lazy, discord.MemberCacheFlags.from_intents(lazy), False),
+        # Same intents, but only cache members we interact with
+        'members, no join cache': (lazy, discord.MemberCacheFlags.none(), False),
+    }
+
+def measure(intents, flags, chunked: bool, members: int, online_ratio: float):
+    client = discord.Client(intents=intents, member_cache_flags=flags)
+    state = client._connection
+
+    online = int(members * online_ratio)
+    # Without chunking, a large guild's GUILD_CREATE only carries online members
+    member_ids = range(10, members + 10) if chunked else range(10, online + 10)
+    presence_ids = range(10, online + 10) if intents.presences else ()
+    payload = guild_payload(member_ids, presence_ids)
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    guild = discord.Guild(data=payload, state=state)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(guild.members), current, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=50_000)
+    parser.add_argument('--online-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+
+    for name, (intents, flags, chunked) in build_policies().items():
+        cached, size, elapsed = measure(intents, flags, chunked, args.members, args.online_ratio)
+        per_member = f"{size / cached:.0f}B/member" if cached else "nothing cached"
+        print(
+            f"{name:<24} {cached:>8} members cached  {size / 1_000_000:>8.1f}MB  "
+            f"({per_member}, built in {elapsed:.2f}s)"
+        )
+
+if __name__ == "__main__":
+    main()
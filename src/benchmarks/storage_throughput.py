@@ -0,0 +1,75 @@
+"""Compare storage backend throughput on the cogs' data paths.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.storage_throughput --duels 5000
+
+Each backend is driven through AsyncDatabase exactly like the cogs use
+it: a duel challenge (bulk stat read), a recorded result, a /duelstats
+lookup with rank, and a leaderboard page every 50 duels.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from utils.async_database import AsyncDatabase
+from utils.database import Database
+from utils.memory_storage import MemoryStorage
+from utils.partitioned_database import GuildPartitionedDatabase
+
+def build_backends(directory: Path):
+    return {
+        'memory': lambda: MemoryStorage(),
+        'sqlite': lambda: Database(directory / "sqlite.db"),
+        'sqlite-write-behind': lambda: Database(directory / "write_behind.db", write_behind=True),
+        'sqlite-per-guild': lambda: GuildPartitionedDatabase(directory / "guilds"),
+    }
+
+async def run_workload(db: AsyncDatabase, duels: int, guilds: int, players: int, seed: int) -> float:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    for i in range(duels):
+        guild_id = rng.randrange(guilds)
+        challenger, target = rng.sample(range(players), 2)
+
+        await db.get_many_duel_stats(guild_id, [challenger, target])
+        winner, loser = (challenger, target) if rng.random() < 0.5 else (target, challenger)
+        await db.record_duel_result(guild_id, winner, loser)
+        await db.get_duel_stats(guild_id, winner)
+        await db.get_rank(guild_id, winner)
+
+        if i % 50 == 0:
+            await db.count_ranked_duelists(guild_id)
+            await db.get_duel_leaderboard(guild_id, 5, 0)
+
+    return time.perf_counter() - started
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duels', type=int, default=2000)
+    parser.add_argument('--guilds', type=int, default=8)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in build_backends(Path(tmp)).items():
+            db = AsyncDatabase(factory(), cache_size=args.cache_size)
+            try:
+                elapsed = await run_workload(db, args.duels, args.guilds, args.players, args.seed)
+            finally:
+                await db.close()
+
+            hit_rate = db.cache_stats()['hit_rate'] * 100
+            print(
+                f"{name:<22} {args.duels / elapsed:>9.0f} duels/s "
+                f"({elapsed:.2f}s, cache hit rate {hit_rate:.0f}%)"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
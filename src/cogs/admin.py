@@ -1,17 +1,323 @@
+import asyncio
+import logging
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+from utils.backup import create_snapshot
 from utils.helpers import is_admin
+from utils.rest import MODERATION
+
+logger = logging.getLogger("JanitorBot")
 
 class Admin(commands.Cog):
+    rest_priority = MODERATION
+    
     def __init__(self, bot):
         self.bot = bot
+        self.backup_lock = asyncio.Lock()
+    
+    async def cog_load(self):
+        self.bot.scheduler.register('media_restriction', self._expire_media_restriction)
+        
+        interval = self.bot.config.backup_interval_hours
+        # With launcher.py every process shares the database; one backup job is enough
+        if interval and interval > 0 and self.bot.is_primary:
+            self.scheduled_backup.change_interval(hours=interval)
+            self.scheduled_backup.start()
+    
+    async def cog_unload(self):
+        self.bot.scheduler.unregister('media_restriction')
+        self.scheduled_backup.cancel()
+    
+    async def _expire_media_restriction(self, job):
+        guild = self.bot.get_guild(job.guild_id)
+        role = guild and guild.get_role(job.payload['role_id'])
+        if role is None:
+            return
+        
+        user_id = int(job.key)
+        try:
+            member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return  # Left the server; nothing to remove
+        await member.remove_roles(role, reason="Media restriction expired")
+    
+    async def _run_backup(self):
+        async with self.backup_lock:
+            return await create_snapshot(
+                self.bot.db,
+                directory=self.bot.config.backup_directory,
+                keep=self.bot.config.backup_keep,
+                pages_per_step=self.bot.config.backup_pages_per_step,
+                step_delay_ms=self.bot.config.backup_step_delay_ms
+            )
+    
+    @tasks.loop(hours=24)
+    async def scheduled_backup(self):
+        try:
+            await self._run_backup()
+        except Exception as e:
+            logger.error(f"Scheduled backup failed: {e}")
+    
+    @scheduled_backup.before_loop
+    async def before_scheduled_backup(self):
+        await self.bot.wait_until_ready()
+    
+    @app_commands.command(name="backup", description="Take a snapshot of the bot database")
+    @app_commands.check(is_admin)
+    async def backup(self, interaction: discord.Interaction):
+        if self.backup_lock.locked():
+            return await interaction.response.send_message(
+                embed=discord.Embed(
+                    title="Backup Running",
+                    description="A backup is already in progress.",
+                    color=discord.Color.orange()
+                ),
+                ephemeral=True
+            )
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            report = await self._run_backup()
+        except Exception as e:
+            return await interaction.followup.send(
+                embed=discord.Embed(
+                    title="Backup Failed",
+                    description=str(e),
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        embed = discord.Embed(
+            title="Backup Complete",
+            description=f"Snapshot written to `{report.path}`",
+            color=self.bot.config.embed_color
+        )
+        embed.add_field(name="Files", value=str(len(report.files)), inline=True)
+        embed.add_field(name="Pages", value=str(report.pages), inline=True)
+        embed.add_field(
+            name="Size",
+            value=f"{report.bytes_copied / 1_000_000:.1f}MB → {report.compressed_bytes / 1_000_000:.1f}MB",
+            inline=True
+        )
+        embed.add_field(
+            name="Throughput",
+            value=f"{report.throughput:.1f}MB/s over {report.seconds:.2f}s",
+            inline=True
+        )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="stats", description="Show slash command latency and error metrics")
+    @app_commands.check(is_admin)
+    async def stats(self, interaction: discord.Interaction):
+        metrics = self.bot.metrics
+        rows = metrics.summary(limit=15)
+        
+        if rows:
+            lines = [f"{'command':<16}{'calls':>6}{'err':>5}{'p50':>7}{'p95':>7}{'resp95':>8}{'rest':>6}"]
+            for name, stats in rows:
+                calls = stats.duration.count
+                lines.append(
+                    f"{name[:15]:<16}{calls:>6}{stats.errors:>5}"
+                    f"{stats.duration.quantile(0.5) * 1000:>6.0f}m"
+                    f"{stats.duration.quantile(0.95) * 1000:>6.0f}m"
+                    f"{stats.first_response.quantile(0.95) * 1000:>7.0f}m"
+                    f"{stats.rest_calls / calls:>6.1f}"
+                )
+            description = "```\n" + "\n".join(lines) + "\n```"
+        else:
+            description = "No commands recorded yet."
+        
+        embed = discord.Embed(
+            title="Command Metrics",
+            description=description,
+            color=self.bot.config.embed_color
+        )
+        embed.set_footer(text="Latencies in ms · resp95 = time to first response · rest = REST calls per run")
+        
+        cache = self.bot.db.cache_stats()
+        embed.add_field(
+            name="Database Cache",
+            value=f"{cache['hit_rate'] * 100:.0f}% hits ({cache['size']}/{cache['maxsize']} entries)",
+            inline=True
+        )
+        users = self.bot.resolver.stats()
+        embed.add_field(
+            name="User Cache",
+            value=f"{users['hit_rate'] * 100:.0f}% hits ({users['size']}/{users['maxsize']} entries)",
+            inline=True
+        )
+        embed.add_field(name="REST Requests", value=str(metrics.rest_requests), inline=True)
+        
+        rest = self.bot.rest.stats()
+        embed.add_field(
+            name="REST Queue",
+            value="\n".join(
+                f"{name}: {s['queued']} queued, {s['delayed']} delayed, {s['shed']} shed, {s['rate_limited']}×429"
+                for name, s in rest.items()
+            ),
+            inline=False
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="restartshard", description="Reconnect a single gateway shard")
+    @app_commands.describe(shard_id="Shard to reconnect (see /ping)")
+    @app_commands.check(is_admin)
+    async def restartshard(self, interaction: discord.Interaction, shard_id: app_commands.Range[int, 0]):
+        shard = self.bot.get_shard(shard_id)
+        if shard is None:
+            return await interaction.response.send_message(
+                embed=discord.Embed(
+                    title="Unknown Shard",
+                    description=f"This process runs shards {', '.join(map(str, sorted(self.bot.shards)))}",
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        await interaction.response.defer(ephemeral=True)
+        logger.warning(f"Shard {shard_id} restart requested by {interaction.user} ({interaction.user.id})")
+        
+        try:
+            await shard.reconnect()
+        except Exception as e:
+            return await interaction.followup.send(
+                embed=discord.Embed(
+                    title="Restart Failed",
+                    description=str(e),
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title="Shard Restarted",
+                description=f"Shard {shard_id} reconnected; other shards were not touched.",
+                color=self.bot.config.embed_color
+            ),
+            ephemeral=True
+        )
+    
+    @app_commands.command(name="reloadconfig", description="Reload config.json without restarting")
+    @app_commands.check(is_admin)
+    async def reloadconfig(self, interaction: discord.Interaction):
+        try:
+            await asyncio.to_thread(self.bot.config.reload)
+        except (OSError, ValueError) as e:
+            return await interaction.response.send_message(
+                embed=discord.Embed(
+                    title="Reload Failed",
+                    description=f"Kept the current config.\n```{str(e)[:3900]}```",
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        await interaction.response.send_message(
+            embed=discord.Embed(
+                title="Config Reloaded",
+                description="Token, database and gateway settings still need a restart.",
+                color=self.bot.config.embed_color
+            ),
+            ephemeral=True
+        )
+    
+    @app_commands.command(name="clusterstats", description="Show guilds, shards and memory for every bot process")
+    @app_commands.check(is_admin)
+    async def clusterstats(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            results = await self.bot.broadcast('stats')
+        except ConnectionError as e:
+            return await interaction.followup.send(
+                embed=discord.Embed(
+                    title="Cluster Unavailable",
+                    description=str(e),
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        lines = [f"{'proc':<5}{'shards':<9}{'guilds':>7}{'members':>10}{'ping':>6}{'mem':>7}"]
+        totals = {'guilds': 0, 'members': 0, 'memory_mb': 0}
+        for result in results:
+            cluster_id = result['cluster_id']
+            if 'error' in result:
+                lines.append(f"{cluster_id:<5}{result['error'][:40]}")
+                continue
+            
+            data = result['data']
+            shards = data['shards']
+            shard_range = f"{shards[0]}-{shards[-1]}" if shards else "-"
+            ping = f"{data['latency_ms']}m" if data['latency_ms'] is not None else "-"
+            lines.append(
+                f"{cluster_id:<5}{shard_range:<9}{data['guilds']:>7}{data['members']:>10}"
+                f"{ping:>6}{data['memory_mb']:>6}M"
+            )
+            for key in totals:
+                totals[key] += data[key]
+        
+        embed = discord.Embed(
+            title="Cluster Stats",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=self.bot.config.embed_color
+        )
+        embed.add_field(name="Processes", value=str(len(results)), inline=True)
+        embed.add_field(name="Guilds", value=f"{totals['guilds']:,}", inline=True)
+        embed.add_field(name="Members", value=f"{totals['members']:,}", inline=True)
+        embed.add_field(name="Memory", value=f"{totals['memory_mb']:,}MB peak RSS", inline=True)
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="reloadcog", description="Reload a cog in every bot process")
+    @app_commands.describe(extension="Cog module, e.g. fun or cogs.fun")
+    @app_commands.check(is_admin)
+    async def reloadcog(self, interaction: discord.Interaction, extension: str):
+        if not extension.startswith("cogs."):
+            extension = f"cogs.{extension}"
+        
+        await interaction.response.defer(ephemeral=True)
+        logger.warning(f"Reload of {extension} requested by {interaction.user} ({interaction.user.id})")
+        
+        try:
+            results = await self.bot.broadcast('reload', extension=extension)
+        except ConnectionError as e:
+            return await interaction.followup.send(
+                embed=discord.Embed(
+                    title="Cluster Unavailable",
+                    description=str(e),
+                    color=discord.Color.red()
+                ),
+                ephemeral=True
+            )
+        
+        failed = [r for r in results if 'error' in r]
+        lines = [
+            f"Process {r['cluster_id']}: " + (f"❌ {r['error'][:200]}" if 'error' in r else "✅ reloaded")
+            for r in results
+        ]
+        
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title="Reload Failed" if failed else "Cog Reloaded",
+                description="\n".join(lines),
+                color=discord.Color.red() if failed else self.bot.config.embed_color
+            ),
+            ephemeral=True
+        )
     
     @app_commands.command(name="setlog", description="Set the logging channel")
     @app_commands.describe(channel="Channel for moderation logs")
     @app_commands.check(is_admin)
+    @app_commands.guild_only()
     async def setlog(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        self.bot.config.set_log_channel(channel.id)
+        self.bot.settings.update(interaction.guild.id, log_channel_id=channel.id)
         
         await interaction.response.send_message(
             embed=discord.Embed(
@@ -23,8 +329,9 @@ class Admin(commands.Cog):
     
     @app_commands.command(name="clearlog", description="Clear the logging channel")
     @app_commands.check(is_admin)
+    @app_commands.guild_only()
     async def clearlog(self, interaction: discord.Interaction):
-        self.bot.config.set_log_channel(None)
+        self.bot.settings.update(interaction.guild.id, log_channel_id=None)
         
         await interaction.response.send_message(
             embed=discord.Embed(
@@ -34,6 +341,110 @@ class Admin(commands.Cog):
             )
         )
     
+    @app_commands.command(name="settings", description="View or change this server's bot settings")
+    @app_commands.describe(
+        birthday_role="Role given on birthdays",
+        duel_cooldown="Seconds between Russian Roulette duels",
+        fork_cooldown="Minutes between fork duels",
+        purge_max="Most messages /purge may delete at once",
+        reset="Restore every setting to the bot defaults"
+    )
+    @app_commands.check(is_admin)
+    @app_commands.guild_only()
+    async def settings(
+        self,
+        interaction: discord.Interaction,
+        birthday_role: discord.Role = None,
+        duel_cooldown: app_commands.Range[int, 0, 86400] = None,
+        fork_cooldown: app_commands.Range[int, 0, 1440] = None,
+        purge_max: app_commands.Range[int, 1, 10000] = None,
+        reset: bool = False
+    ):
+        changes = {}
+        if birthday_role is not None:
+            changes['birthday_role_id'] = birthday_role.id
+        if duel_cooldown is not None:
+            changes['duel_cooldown'] = duel_cooldown
+        if fork_cooldown is not None:
+            changes['fork_cooldown_minutes'] = fork_cooldown
+        if purge_max is not None:
+            changes['purge_max'] = purge_max
+        
+        if reset:
+            current = self.bot.settings.reset(interaction.guild.id)
+        elif changes:
+            current = self.bot.settings.update(interaction.guild.id, **changes)
+        else:
+            current = self.bot.settings.get(interaction.guild.id)
+        
+        overridden = self.bot.settings.overrides(interaction.guild.id)
+        
+        def mark(name: str) -> str:
+            return "" if name in overridden else " *(default)*"
+        
+        def mention(role_id: int, kind: str) -> str:
+            return f"<{kind}{role_id}>" if role_id else "Not set"
+        
+        embed = discord.Embed(
+            title="Server Settings",
+            description="Settings Updated" if changes or reset else None,
+            color=self.bot.config.embed_color
+        )
+        embed.add_field(
+            name="Log Channel",
+            value=mention(current.log_channel_id, "#") + mark('log_channel_id'),
+            inline=True
+        )
+        embed.add_field(
+            name="Birthday Role",
+            value=mention(current.birthday_role_id, "@&") + mark('birthday_role_id'),
+            inline=True
+        )
+        embed.add_field(name="Purge Limit", value=f"{current.purge_max}{mark('purge_max')}", inline=True)
+        embed.add_field(name="Duel Cooldown", value=f"{current.duel_cooldown}s{mark('duel_cooldown')}", inline=True)
+        embed.add_field(
+            name="Fork Cooldown",
+            value=f"{current.fork_cooldown_minutes}m{mark('fork_cooldown_minutes')}",
+            inline=True
+        )
+        embed.add_field(
+            name="Protected Roles",
+            value=(", ".join(f"<@&{role_id}>" for role_id in current.protected_roles) or "None")
+            + mark('protected_roles'),
+            inline=False
+        )
+        
+        await interaction.response.send_message(
+            embed=embed,
+            ephemeral=True,
+            allowed_mentions=discord.AllowedMentions.none()
+        )
+    
+    @app_commands.command(name="protectrole", description="Toggle whether a role can be edited with /customize")
+    @app_commands.describe(role="Role to protect or unprotect")
+    @app_commands.check(is_admin)
+    @app_commands.guild_only()
+    async def protectrole(self, interaction: discord.Interaction, role: discord.Role):
+        protected = set(self.bot.settings.get(interaction.guild.id).protected_roles)
+        
+        if role.id in protected:
+            protected.discard(role.id)
+            description = f"{role.mention} can be customized again"
+        else:
+            protected.add(role.id)
+            description = f"{role.mention} is now protected from /customize"
+        
+        self.bot.settings.update(interaction.guild.id, protected_roles=protected)
+        
+        await interaction.response.send_message(
+            embed=discord.Embed(
+                title="Config Updated",
+                description=description,
+                color=self.bot.config.embed_color
+            ),
+            allowed_mentions=discord.AllowedMentions.none()
+        )
+    
     @app_commands.command(name="clonerole", description="Clone an existing role")
     @app_commands.describe(
         role="Role to clone",
@@ -278,16 +689,15 @@ class Admin(commands.Cog):
             delta = parse_duration(duration)
             if delta:
                 time_msg = f" for {duration}"
-                
-                async def remove_later():
-                    import asyncio
-                    await asyncio.sleep(delta.total_seconds())
-                    try:
-                        await user.remove_roles(no_media_role)
-                    except:
-                        pass
-                
-                self.bot.loop.create_task(remove_later())
+                # Persisted, so the restriction still ends if the bot restarts meanwhile
+                await self.bot.scheduler.schedule(
+                    interaction.guild.id, 'media_restriction', user.id, delta,
+                    role_id=no_media_role.id
+                )
+        
+        if not time_msg:
+            # A permanent restriction replaces any earlier timed one
+            await self.bot.scheduler.cancel(interaction.guild.id, 'media_restriction', user.id)
         
         embed = discord.Embed(
             title="Media Restrictions Applied",
@@ -324,6 +734,7 @@ class Admin(commands.Cog):
             )
         
         await user.remove_roles(no_media_role)
+        await self.bot.scheduler.cancel(interaction.guild.id, 'media_restriction', user.id)
         
         await interaction.response.send_message(
             embed=discord.Embed(
@@ -3,20 +3,19 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Optional
 import re
+from utils.rest import COSMETIC
 
 class Customize(commands.Cog):
+    rest_priority = COSMETIC
+    
     def __init__(self, bot):
         self.bot = bot
-        
-        # Protected role IDs that cannot be customized
-        self.protected_roles = [
-            # EEDIT THESE FOR YOUR SERVER
-            # 123456789012345678,  # Admin role
-            # 234567890123456789,  # Moderator role
-            # 345678901234567890,  # Member role
-        ]
         self.max_custom_roles = 2
     
+    def _protected_roles(self, guild: discord.Guild):
+        # Set per server with /protectrole; defaults to roles.protected_role_ids
+        return self.bot.settings.get(guild.id).protected_roles
+    
     def _parse_color(self, color_str: str) -> Optional[discord.Color]:
         color_str = color_str.lstrip('#').strip()
         if len(color_str) == 6:
@@ -93,20 +92,20 @@ class Customize(commands.Cog):
         role_to_edit: Optional[discord.Role] = None
     ) -> Optional[discord.Role]:
         if role_to_edit:
-            if role_to_edit.id in self.protected_roles:
+            if role_to_edit.id in self._protected_roles(member.guild):
                 return None
             
             if role_to_edit not in member.roles:
                 return None
             
-            user_custom_roles = self.bot.db.get_user_custom_roles(member.id)
+            user_custom_roles = await self.bot.db.get_user_custom_roles(member.guild.id, member.id)
             if role_to_edit.id not in [r[0] for r in user_custom_roles]:
                 return None
             
             return role_to_edit
         
 
-        user_custom_roles = self.bot.db.get_user_custom_roles(member.id)
+        user_custom_roles = await self.bot.db.get_user_custom_roles(member.guild.id, member.id)
         for role_id, _ in user_custom_roles:
             role = member.guild.get_role(role_id)
             if role and role in member.roles:
@@ -129,7 +128,7 @@ class Customize(commands.Cog):
             
             await member.add_roles(new_role)
             await self._position_role_above_user_roles(new_role, member)
-            self.bot.db.add_custom_role(member.id, new_role.id)
+            await self.bot.db.add_custom_role(member.guild.id, member.id, new_role.id)
             
             return new_role
             
@@ -148,6 +147,7 @@ class Customize(commands.Cog):
         color="Color (hex like #FF5733 or name like 'red')",
         nickname="Set your nickname at the same time"
     )
+    @app_commands.guild_only()
     async def customize(
         self,
         interaction: discord.Interaction,
@@ -195,7 +195,7 @@ class Customize(commands.Cog):
             custom_role = await self._get_or_create_custom_role(member, role)
             
             if not custom_role:
-                if role and role.id in self.protected_roles:
+                if role and role.id in self._protected_roles(interaction.guild):
                     return await interaction.followup.send(
                         embed=discord.Embed(
                             title="Protected Role",
@@ -213,7 +213,7 @@ class Customize(commands.Cog):
                         ),
                         ephemeral=True
                     )
-                elif self.bot.db.count_user_custom_roles(member.id) >= self.max_custom_roles:
+                elif await self.bot.db.count_user_custom_roles(member.guild.id, member.id) >= self.max_custom_roles:
                     return await interaction.followup.send(
                         embed=discord.Embed(
                             title="Custom Role Limit Reached",
@@ -267,7 +267,7 @@ class Customize(commands.Cog):
                 color=self.bot.config.embed_color
             )
             if name or color:
-                user_roles = self.bot.db.get_user_custom_roles(member.id)
+                user_roles = await self.bot.db.get_user_custom_roles(member.guild.id, member.id)
                 if user_roles:
                     embed.add_field(
                         name="Your Custom Roles",
@@ -290,8 +290,9 @@ class Customize(commands.Cog):
         name="mycustomroles",
         description="View your custom roles and their status"
     )
+    @app_commands.guild_only()
     async def my_custom_roles(self, interaction: discord.Interaction):
-        user_roles = self.bot.db.get_user_custom_roles(interaction.user.id)
+        user_roles = await self.bot.db.get_user_custom_roles(interaction.guild.id, interaction.user.id)
         
         if not user_roles:
             return await interaction.response.send_message(
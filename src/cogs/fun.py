@@ -5,14 +5,31 @@ import aiohttp
 import random
 import re
 from datetime import timedelta
-import asyncio
+from utils.rest import COSMETIC
 
 class Fun(commands.Cog):
+    rest_priority = COSMETIC
+    
     def __init__(self, bot):
         self.bot = bot
         self.fork_sessions = {}
         self.fork_cooldowns = {}
         self.last_quotes = []
+        self._session = None
+    
+    async def cog_load(self):
+        self.bot.scheduler.register('fork_timeout', self._expire_fork)
+    
+    async def cog_unload(self):
+        self.bot.scheduler.unregister('fork_timeout')
+        if self._session:
+            await self._session.close()
+    
+    def _http(self):
+        # One pooled session for the lookup commands, created on first use
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        return self._session
     
     @app_commands.command(name="coinflip", description="Flip a coin")
     async def coinflip(self, interaction: discord.Interaction):
@@ -72,40 +89,39 @@ class Fun(commands.Cog):
         
         url = f"https://api.urbandictionary.com/v0/define?term={word}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return await interaction.followup.send(
-                        embed=discord.Embed(
-                            title="Error",
-                            description="Couldn't reach Urban Dictionary",
-                            color=discord.Color.red()
-                        )
+        async with self._http().get(url) as resp:
+            if resp.status != 200:
+                return await interaction.followup.send(
+                    embed=discord.Embed(
+                        title="Error",
+                        description="Couldn't reach Urban Dictionary",
+                        color=discord.Color.red()
                     )
-                
-                data = await resp.json()
-                if not data['list']:
-                    return await interaction.followup.send(
-                        embed=discord.Embed(
-                            title="No Definition Found",
-                            description=f"No urban definition found for **{word}**",
-                            color=self.bot.config.embed_color
-                        )
+                )
+            
+            data = await resp.json()
+            if not data['list']:
+                return await interaction.followup.send(
+                    embed=discord.Embed(
+                        title="No Definition Found",
+                        description=f"No urban definition found for **{word}**",
+                        color=self.bot.config.embed_color
                     )
-                
-                definition = data['list'][0]['definition'].replace('[', '').replace(']', '')
-                example = data['list'][0]['example'].replace('[', '').replace(']', '')
-                
-                embed = discord.Embed(
-                    title=f"Urban Dictionary: {word}",
-                    description=definition[:1024],
-                    color=self.bot.config.embed_color
                 )
-                
-                if example:
-                    embed.add_field(name="Example", value=example[:1024], inline=False)
-                
-                await interaction.followup.send(embed=embed)
+            
+            definition = data['list'][0]['definition'].replace('[', '').replace(']', '')
+            example = data['list'][0]['example'].replace('[', '').replace(']', '')
+            
+            embed = discord.Embed(
+                title=f"Urban Dictionary: {word}",
+                description=definition[:1024],
+                color=self.bot.config.embed_color
+            )
+            
+            if example:
+                embed.add_field(name="Example", value=example[:1024], inline=False)
+            
+            await interaction.followup.send(embed=embed)
     
     @app_commands.command(name="define", description="Get dictionary definition")
     @app_commands.describe(word="Word to define")
@@ -114,47 +130,46 @@ class Fun(commands.Cog):
         
         url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return await interaction.followup.send(
-                        embed=discord.Embed(
-                            title="No Definition Found",
-                            description=f"No dictionary definition found for **{word}**",
-                            color=self.bot.config.embed_color
-                        )
+        async with self._http().get(url) as resp:
+            if resp.status != 200:
+                return await interaction.followup.send(
+                    embed=discord.Embed(
+                        title="No Definition Found",
+                        description=f"No dictionary definition found for **{word}**",
+                        color=self.bot.config.embed_color
                     )
-                
-                data = await resp.json()
-                entry = data[0]
-                word = entry['word']
-                meanings = entry['meanings']
-                
-                embed = discord.Embed(
-                    title=f"Dictionary: {word}",
-                    color=self.bot.config.embed_color
                 )
+            
+            data = await resp.json()
+            entry = data[0]
+            word = entry['word']
+            meanings = entry['meanings']
+            
+            embed = discord.Embed(
+                title=f"Dictionary: {word}",
+                color=self.bot.config.embed_color
+            )
+            
+            for meaning in meanings[:3]:
+                part_of_speech = meaning['partOfSpeech']
+                definitions = meaning['definitions']
                 
-                for meaning in meanings[:3]:
-                    part_of_speech = meaning['partOfSpeech']
-                    definitions = meaning['definitions']
-                    
-                    value = ""
-                    for i, definition in enumerate(definitions[:3]):
-                        value += f"{i+1}. {definition['definition']}\n"
-                        if 'example' in definition:
-                            value += f"   *\"{definition['example']}\"*\n"
-                    
-                    embed.add_field(
-                        name=part_of_speech.capitalize(),
-                        value=value or "No definition available",
-                        inline=False
-                    )
-                
-                if 'phonetic' in entry:
-                    embed.set_footer(text=f"Pronunciation: {entry['phonetic']}")
+                value = ""
+                for i, definition in enumerate(definitions[:3]):
+                    value += f"{i+1}. {definition['definition']}\n"
+                    if 'example' in definition:
+                        value += f"   *\"{definition['example']}\"*\n"
                 
-                await interaction.followup.send(embed=embed)
+                embed.add_field(
+                    name=part_of_speech.capitalize(),
+                    value=value or "No definition available",
+                    inline=False
+                )
+            
+            if 'phonetic' in entry:
+                embed.set_footer(text=f"Pronunciation: {entry['phonetic']}")
+            
+            await interaction.followup.send(embed=embed)
     
     @app_commands.command(name="quote", description="Get a random quote from a user")
     @app_commands.describe(user="User to quote (leave empty for yourself)")
@@ -258,12 +273,13 @@ class Fun(commands.Cog):
     
     @app_commands.command(name="fork", description="Challenge someone to a fork duel")
     @app_commands.describe(target="User to challenge (leave empty to check cooldown)")
+    @app_commands.guild_only()
     async def fork(self, interaction: discord.Interaction, target: discord.Member = None):
         now = discord.utils.utcnow()
 
         if target is None:
             last_used = self.fork_cooldowns.get(interaction.user.id)
-            cooldown_delta = timedelta(minutes=self.bot.config.fork_cooldown_minutes)
+            cooldown_delta = timedelta(minutes=self.bot.settings.get(interaction.guild_id).fork_cooldown_minutes)
             
             if last_used:
                 remaining = (last_used + cooldown_delta) - now
@@ -316,7 +332,7 @@ class Fun(commands.Cog):
             )
         
         last_used = self.fork_cooldowns.get(interaction.user.id)
-        cooldown_delta = timedelta(minutes=self.bot.config.fork_cooldown_minutes)
+        cooldown_delta = timedelta(minutes=self.bot.settings.get(interaction.guild_id).fork_cooldown_minutes)
         
         if last_used and now - last_used < cooldown_delta:
             remaining = (last_used + cooldown_delta) - now
@@ -357,26 +373,39 @@ class Fun(commands.Cog):
             )
         )
         
-        await asyncio.sleep(60)
-        if interaction.user.id in self.fork_sessions:
-            self.fork_sessions.pop(interaction.user.id)
-            until = discord.utils.utcnow() + timedelta(seconds=85)
-            
-            await interaction.followup.send(
-                embed=discord.Embed(
-                    title="Fork Duel Timed Out",
-                    description=(
-                        f"{interaction.user.mention} failed to guess in time.\n"
-                        f"They receive a 1 minute 25 second timeout."
-                    ),
-                    color=discord.Color.orange()
-                )
+        await self.bot.scheduler.schedule(
+            interaction.guild_id, 'fork_timeout', interaction.user.id, timedelta(seconds=60),
+            channel_id=interaction.channel_id
+        )
+    
+    async def _expire_fork(self, job):
+        user_id = int(job.key)
+        # The session is gone if they guessed in time or the bot restarted
+        if self.fork_sessions.pop(user_id, None) is None:
+            return
+        
+        guild = self.bot.get_guild(job.guild_id)
+        channel = guild and guild.get_channel(job.payload['channel_id'])
+        if channel is None:
+            return
+        
+        until = discord.utils.utcnow() + timedelta(seconds=85)
+        await channel.send(
+            embed=discord.Embed(
+                title="Fork Duel Timed Out",
+                description=(
+                    f"<@{user_id}> failed to guess in time.\n"
+                    f"They receive a 1 minute 25 second timeout."
+                ),
+                color=discord.Color.orange()
             )
-            
-            try:
-                await interaction.user.timeout(until, reason="Failed to respond to fork duel")
-            except:
-                pass
+        )
+        
+        try:
+            member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+            await member.timeout(until, reason="Failed to respond to fork duel")
+        except:
+            pass
     
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -391,6 +420,7 @@ class Fun(commands.Cog):
             return
         
         target, number = self.fork_sessions.pop(message.author.id)
+        await self.bot.scheduler.cancel(target.guild.id, 'fork_timeout', message.author.id)
         delta = abs(guess - number)
         
         if delta <= 9:
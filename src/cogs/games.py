@@ -4,13 +4,17 @@ from discord.ext import commands
 import random
 import asyncio
 from datetime import datetime, timedelta
+from utils.rest import COSMETIC
 
 class Games(commands.Cog):
+    rest_priority = COSMETIC
+    
     def __init__(self, bot):
         self.bot = bot
     
     @app_commands.command(name="rrd", description="Challenge someone to Russian Roulette")
     @app_commands.describe(target="User to challenge")
+    @app_commands.guild_only()
     async def russian_roulette_duel(self, interaction: discord.Interaction, target: discord.Member):
         if target == interaction.user:
             return await interaction.response.send_message(
@@ -32,12 +36,15 @@ class Games(commands.Cog):
                 ephemeral=True
             )
         
-        author_stats = self.bot.db.get_duel_stats(interaction.user.id)
+        stats = await self.bot.db.get_many_duel_stats(interaction.guild.id, [interaction.user.id, target.id])
+        author_stats = stats[interaction.user.id]
         last_duel = author_stats['last_duel']
         current_time = datetime.now().timestamp()
         
-        if last_duel and (current_time - last_duel) < self.bot.config.duel_cooldown:
-            cooldown_end = datetime.fromtimestamp(last_duel + self.bot.config.duel_cooldown)
+        duel_cooldown = self.bot.settings.get(interaction.guild.id).duel_cooldown
+        
+        if last_duel and (current_time - last_duel) < duel_cooldown:
+            cooldown_end = datetime.fromtimestamp(last_duel + duel_cooldown)
             return await interaction.response.send_message(
                 embed=discord.Embed(
                     title="Cooldown Active",
@@ -47,7 +54,7 @@ class Games(commands.Cog):
                 ephemeral=True
             )
         
-        target_stats = self.bot.db.get_duel_stats(target.id)
+        target_stats = stats[target.id]
         embed = discord.Embed(
             title="🔫 Duel Challenge",
             description=(
@@ -80,9 +87,11 @@ class Games(commands.Cog):
 
     @app_commands.command(name="duelstats", description="View duel statistics")
     @app_commands.describe(user="User to check stats for (leave empty for yourself)")
+    @app_commands.guild_only()
     async def duel_stats(self, interaction: discord.Interaction, user: discord.Member = None):
         target = user or interaction.user
-        stats = self.bot.db.get_duel_stats(target.id)
+        stats = await self.bot.db.get_duel_stats(interaction.guild.id, target.id)
+        rank = await self.bot.db.get_rank(interaction.guild.id, target.id)
         
         embed = discord.Embed(
             title=f"🏆 Duel Statistics: {target.display_name}",
@@ -113,7 +122,14 @@ class Games(commands.Cog):
             embed.add_field(
                 name="📊 Win Rate",
                 value=f"{win_rate:.1f}%",
-                inline=False
+                inline=True
+            )
+        
+        if rank:
+            embed.add_field(
+                name="🏅 Leaderboard Rank",
+                value=f"#{rank}",
+                inline=True
             )
         
         if stats['last_duel'] > 0:
@@ -122,24 +138,36 @@ class Games(commands.Cog):
         await interaction.response.send_message(embed=embed)
     
     @app_commands.command(name="rrdleaderboard", description="View duel leaderboard")
-    async def rrd_leaderboard(self, interaction: discord.Interaction):
-        top_players = self.bot.db.get_duel_leaderboard(5)
+    @app_commands.describe(page="Leaderboard page (5 players per page)")
+    @app_commands.guild_only()
+    async def rrd_leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1] = 1):
+        per_page = 5
+        total_players = await self.bot.db.count_ranked_duelists(interaction.guild.id)
+        total_pages = max(1, -(-total_players // per_page))
+        page = min(page, total_pages)
+        offset = (page - 1) * per_page
+        top_players = await self.bot.db.get_duel_leaderboard(interaction.guild.id, per_page, offset)
         
         embed = discord.Embed(
             title=":crossed_swords: Russian Roulette Duel Leaderboard",
-            description="Top 5 players by win ratio",
+            description=f"Players by win ratio • Page {page}/{total_pages}",
             color=self.bot.config.embed_color
         )
         
         if not top_players:
             embed.description = "No duel data available yet."
         else:
+            # Cached users cost nothing; the rest are fetched concurrently
+            users = await asyncio.gather(
+                *(self.bot.resolver.get_user(user_id) for user_id, _, _ in top_players),
+                return_exceptions=True
+            )
+            
             leaderboard = []
-            for i, (user_id, wins, losses) in enumerate(top_players):
-                try:
-                    user = await self.bot.fetch_user(user_id)
+            for i, ((user_id, wins, losses), user) in enumerate(zip(top_players, users), start=offset):
+                if isinstance(user, discord.abc.User):
                     username = user.display_name
-                except:
+                else:
                     username = f"Unknown User ({user_id})"
                 
                 total = wins + losses
@@ -219,11 +247,7 @@ class DuelView(discord.ui.View):
                 loser = turn_names[current_turn]
                 winner = turn_names[1 - current_turn]
                 
-                self.bot.db.update_duel_stats(winner.id, won=True)
-                self.bot.db.update_duel_stats(loser.id, won=False)
-                
-                winner_stats = self.bot.db.get_duel_stats(winner.id)
-                loser_stats = self.bot.db.get_duel_stats(loser.id)
+                winner_stats, loser_stats = await self.bot.db.record_duel_result(interaction.guild.id, winner.id, loser.id)
                 
                 embed = discord.Embed(
                     title="🔫 Russian Roulette Duel",
@@ -1,11 +1,16 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import math
 import time
 from datetime import datetime
 import re
+from utils.helpers import ensure_chunked
+from utils.rest import COSMETIC
 
 class Info(commands.Cog):
+    rest_priority = COSMETIC
+    
     def __init__(self, bot):
         self.bot = bot
         self.months = {
@@ -172,20 +177,17 @@ class Info(commands.Cog):
             try:
                 user_id = int(user.strip('<@!>'))
                 try:
-                    target = await self.bot.fetch_user(user_id)
-                except:
+                    # Members get the server-specific fields; anyone else is shown as a user
                     if interaction.guild:
-                        try:
-                            target = await interaction.guild.fetch_member(user_id)
-                        except:
-                            pass
+                        target = await self.bot.resolver.get_member(interaction.guild, user_id)
+                    if target is None:
+                        target = await self.bot.resolver.get_user(user_id)
+                except discord.HTTPException:
+                    pass
             except ValueError:
                 if interaction.guild:
-                    target = discord.utils.find(
-                        lambda m: user.lower() in m.name.lower() or 
-                                 (m.nick and user.lower() in m.nick.lower()),
-                        interaction.guild.members
-                    )
+                    matches = await self.bot.member_index.search(interaction.guild, user, limit=1)
+                    target = matches[0] if matches else None
             
             if not target:
                 return await interaction.followup.send(
@@ -324,8 +326,8 @@ class Info(commands.Cog):
             )
         
         try:
-            full_user = await self.bot.fetch_user(target.id)
-            if full_user.banner:
+            full_user = await self.bot.resolver.fetch_user(target.id)
+            if full_user and full_user.banner:
                 embed.set_image(url=full_user.banner.url)
                 embed.add_field(
                     name="🎨 Banner",
@@ -342,6 +344,21 @@ class Info(commands.Cog):
         
         await interaction.followup.send(embed=embed)
     
+    @whois.autocomplete('user')
+    async def whois_user_autocomplete(self, interaction: discord.Interaction, current: str):
+        if not interaction.guild or not current:
+            return []
+        
+        members = self.bot.member_index.autocomplete(interaction.guild, current)
+        # Usernames are unique, so the name lookup in /whois resolves the choice exactly
+        return [
+            app_commands.Choice(
+                name=f"{member.display_name} (@{member.name})"[:100],
+                value=member.name
+            )
+            for member in members
+        ]
+    
     @app_commands.command(name="uptime", description="Show how long the bot has been running")
     async def uptime(self, interaction: discord.Interaction):
         """Display bot uptime"""
@@ -354,19 +371,53 @@ class Info(commands.Cog):
             color=self.bot.config.embed_color
         )
         
+        counts = self.bot.shard_guild_counts()
+        lines = []
+        for shard_id in sorted(self.bot.shards):
+            connected_at = self.bot.shard_connected_at.get(shard_id)
+            since = f"connected <t:{int(connected_at)}:R>" if connected_at else "**disconnected**"
+            lines.append(f"`#{shard_id}` {since} · {counts.get(shard_id, 0)} guilds")
+        embed.add_field(name="Shards", value=self._shard_lines(lines), inline=False)
+        
         await interaction.response.send_message(embed=embed)
     
+    def _shard_lines(self, lines) -> str:
+        # Embed fields cap at 1024 characters
+        shown = []
+        for line in lines:
+            if sum(len(l) + 1 for l in shown) + len(line) > 960:
+                shown.append(f"…and {len(lines) - len(shown)} more")
+                break
+            shown.append(line)
+        return "\n".join(shown) or "No shards connected"
+    
     @app_commands.command(name="ping", description="Check bot latency")
     async def ping(self, interaction: discord.Interaction):
         """Display bot latency"""
-        latency_ms = round(self.bot.latency * 1000)
+        latency_ms = round(self.bot.latency * 1000) if math.isfinite(self.bot.latency) else None
+        current_shard = interaction.guild.shard_id if interaction.guild else 0
         
         embed = discord.Embed(
             title="🏓 Pong!",
-            description=f"Latency: **{latency_ms}ms**",
+            description=f"Average latency: **{latency_ms}ms**" if latency_ms is not None else "Latency: unknown",
             color=self.bot.config.embed_color
         )
         
+        counts = self.bot.shard_guild_counts()
+        lines = []
+        for shard_id, shard in sorted(self.bot.shards.items()):
+            if shard.is_closed():
+                state = "**down**"
+            elif not math.isfinite(shard.latency):
+                state = "connecting"
+            else:
+                state = f"{shard.latency * 1000:.0f}ms"
+                if shard.is_ws_ratelimited():
+                    state += " (rate limited)"
+            marker = " ← this server" if shard_id == current_shard else ""
+            lines.append(f"`#{shard_id}` {state} · {counts.get(shard_id, 0)} guilds{marker}")
+        embed.add_field(name="Shards", value=self._shard_lines(lines), inline=False)
+        
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="birthdays", description="Show upcoming birthdays")
@@ -395,6 +446,8 @@ class Info(commands.Cog):
             target_channel = interaction.channel
         
         await interaction.response.defer()
+        # role.members only sees cached members
+        await ensure_chunked(guild)
         
         today = datetime.now(datetime.now().astimezone().tzinfo).date()
         upcoming = []
@@ -471,7 +524,7 @@ class Info(commands.Cog):
         )
 
         if today_members:
-            birthday_role_id = self.bot.config.birthday_role_id
+            birthday_role_id = self.bot.settings.get(guild.id).birthday_role_id
             if birthday_role_id:
                 special_role = guild.get_role(birthday_role_id)
                 if special_role:
@@ -1,13 +1,47 @@
+import logging
+import re
+import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta
 from utils.helpers import parse_duration, is_admin
-import io
+from utils.purge import MAX_PATTERN_LENGTH, SCAN_MULTIPLIER, PurgeFilters, PurgeJob, parse_bound
+from utils.rest import MODERATION
+from utils.transcript import TranscriptError, TranscriptWriter
+
+logger = logging.getLogger("JanitorBot")
 
 class Moderation(commands.Cog):
+    rest_priority = MODERATION
+    
     def __init__(self, bot):
         self.bot = bot
+        # channel ID -> running purge
+        self._purges = {}
+    
+    async def cog_load(self):
+        self.bot.scheduler.register('unban', self._expire_ban)
+    
+    async def cog_unload(self):
+        self.bot.scheduler.unregister('unban')
+        for job in self._purges.values():
+            job.cancel()
+    
+    async def _expire_ban(self, job):
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return
+        
+        try:
+            await guild.unban(discord.Object(id=int(job.key)), reason="Temporary ban expired")
+        except discord.NotFound:
+            pass  # Already unbanned by hand
+    
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild, user):
+        # Lifted by hand (or by the job itself); a later ban must not inherit the old expiry
+        await self.bot.scheduler.cancel(guild.id, 'unban', user.id)
     
     @app_commands.command(name="ban", description="Ban a user from the server")
     @app_commands.describe(
@@ -50,6 +84,12 @@ class Moderation(commands.Cog):
             delete_message_days=min(delete_days, 7)
         )
         
+        if until:
+            await self.bot.scheduler.schedule(interaction.guild.id, 'unban', user.id, until)
+        else:
+            # A permanent ban replaces any earlier temporary one
+            await self.bot.scheduler.cancel(interaction.guild.id, 'unban', user.id)
+        
         embed = discord.Embed(title="User Banned", color=self.bot.config.embed_color)
         
         if until:
@@ -189,76 +229,230 @@ class Moderation(commands.Cog):
                 ephemeral=True
             )
     
-    @app_commands.command(name="purge", description="Bulk delete messages")
+    @app_commands.command(
+        name="purge",
+        description="Delete matching messages from the last 14 days (checks the newest amount×10 unless after is set)"
+    )
     @app_commands.describe(
-        amount="Number of messages to delete (max 350)",
-        user="Only delete messages from this user"
+        amount="Most messages to delete (up to the server's purge limit); without after, only the newest amount×10 are checked",
+        user="Only delete messages from this user",
+        bots="Only delete messages from bots",
+        links="Only delete messages containing links",
+        attachments="Only delete messages with attachments",
+        pattern="Only delete messages matching this regular expression",
+        before="Only messages before this message ID/link or time ago (e.g. 2h)",
+        after="Only messages after this message ID/link or time ago (e.g. 1d); lifts the amount×10 scan cap",
+        include_old="Also delete messages older than 14 days, one per second (slow)"
     )
     @app_commands.check(is_admin)
     async def purge(
         self,
         interaction: discord.Interaction,
         amount: int,
-        user: discord.Member = None
+        user: discord.Member = None,
+        bots: bool = False,
+        links: bool = False,
+        attachments: bool = False,
+        pattern: str = None,
+        before: str = None,
+        after: str = None,
+        include_old: bool = False
     ):
-        if not 1 <= amount <= self.bot.config.purge_max:
-            return await interaction.response.send_message(
-                embed=discord.Embed(
-                    title="Invalid Amount",
-                    description=f"Amount must be between 1 and {self.bot.config.purge_max}",
-                    color=discord.Color.red()
-                ),
+        settings = self.bot.settings.get(interaction.guild_id)
+        
+        def invalid(title, description):
+            return interaction.response.send_message(
+                embed=discord.Embed(title=title, description=description, color=discord.Color.red()),
                 ephemeral=True
             )
         
-        await interaction.response.defer(ephemeral=True)
+        if not 1 <= amount <= settings.purge_max:
+            return await invalid("Invalid Amount", f"Amount must be between 1 and {settings.purge_max}")
         
-        def check(m):
-            if user:
-                return m.author == user
-            return True
+        compiled = None
+        if pattern:
+            if len(pattern) > MAX_PATTERN_LENGTH:
+                return await invalid("Invalid Pattern", f"Patterns are limited to {MAX_PATTERN_LENGTH} characters")
+            try:
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                return await invalid("Invalid Pattern", str(e))
         
-        deleted = await interaction.channel.purge(limit=amount, check=check)
-        log_channel_id = self.bot.config.log_channel_id
-        if log_channel_id:
-            log_channel = self.bot.get_channel(log_channel_id)
-            if log_channel:
-                log_content = "\n".join(
-                    f"[{msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}] "
-                    f"{msg.author.display_name}: {msg.clean_content}"
-                    for msg in reversed(deleted)
-                )
-                
-                embed = discord.Embed(
-                    title="Purge Log",
-                    description=(
-                        f"**Moderator:** {interaction.user.mention}\n"
-                        f"**Channel:** {interaction.channel.mention}\n"
-                        f"**Messages Deleted:** {len(deleted)}"
-                    ),
-                    color=self.bot.config.embed_color,
-                    timestamp=datetime.utcnow()
-                )
-                
-                try:
-                    await log_channel.send(
-                        embed=embed,
-                        file=discord.File(
-                            io.StringIO(log_content),
-                            filename=f"purge_{interaction.channel.name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-                        )
+        bounds = {}
+        for name, value in (('before', before), ('after', after)):
+            if value:
+                bounds[name] = parse_bound(value)
+                if bounds[name] is None:
+                    return await invalid(
+                        "Invalid Range",
+                        f"`{name}` must be a message ID, a message link or a time ago like `2h` or `3d`"
                     )
-                except:
-                    pass
+        if bounds.get('before') and bounds.get('after') and bounds['after'] >= bounds['before']:
+            return await invalid("Invalid Range", "`after` must be earlier than `before`")
         
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="Messages Purged",
-                description=f"Deleted {len(deleted)} message(s)",
-                color=self.bot.config.embed_color
+        channel = interaction.channel
+        if channel.id in self._purges:
+            return await invalid("Purge Running", f"A purge of {channel.mention} is already in progress")
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        log_channel = self.bot.get_channel(settings.log_channel_id) if settings.log_channel_id else None
+        writer = None
+        note = ""
+        if log_channel:
+            try:
+                writer = TranscriptWriter(
+                    f"purge_{channel.name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+                    max_part_size=interaction.guild.filesize_limit,
+                    header=(
+                        f"Purge of #{channel.name} ({channel.id}) by {interaction.user} ({interaction.user.id}), "
+                        "newest messages first"
+                    )
+                )
+            except TranscriptError as e:
+                logger.error(f"Could not start purge transcript for guild {interaction.guild_id}: {e}")
+                note = "\n\nNo transcript could be written for this purge."
+        
+        filters = PurgeFilters(
+            user_id=user.id if user else None,
+            bots=bots,
+            links=links,
+            attachments=attachments,
+            pattern=compiled
+        )
+        job = PurgeJob(
+            channel,
+            filters,
+            limit=amount,
+            before=bounds.get('before'),
+            after=bounds.get('after'),
+            transcript=writer,
+            reason=f"Purge by {interaction.user} ({interaction.user.id})",
+            # An after bound already ends the scan; otherwise stay near amount
+            scan_limit=None if bounds.get('after') else amount * SCAN_MULTIPLIER,
+            include_old=include_old
+        )
+        view = PurgeView(job, interaction.user.id)
+        self._purges[channel.id] = job
+        
+        progress_visible = True
+        
+        async def progress(job):
+            nonlocal progress_visible
+            if not progress_visible:
+                return
+            try:
+                await interaction.edit_original_response(embed=self._purge_embed(job, "Purging..."), view=view)
+            except discord.HTTPException as e:
+                # The interaction token lasts 15 minutes; keep purging without updates
+                logger.info(f"Stopped purge progress updates in {channel.id}: {e}")
+                progress_visible = False
+        
+        error = None
+        try:
+            try:
+                await progress(job)
+                await job.run(progress)
+            except discord.Forbidden:
+                error = "I don't have permission to delete messages here."
+            except TranscriptError as e:
+                logger.error(f"Could not write purge transcript for guild {interaction.guild_id}: {e}")
+                error = "The transcript could not be written; the purge was stopped."
+                writer.close()
+                writer = None
+            except (discord.HTTPException, aiohttp.ClientError) as e:
+                logger.warning(f"Purge of {channel.id} in guild {interaction.guild_id} stopped: {e}")
+                error = "The purge was stopped by an error talking to Discord; run it again to continue."
+            finally:
+                del self._purges[channel.id]
+                view.stop()
+            
+            if error:
+                note += f"\n\n{error}"
+            if writer is not None and job.deleted:
+                note += await self._send_purge_log(interaction, log_channel, writer, job)
+            
+            if error:
+                title = "Purge Stopped"
+            elif job.cancelled:
+                title = "Purge Cancelled"
+            else:
+                title = "Messages Purged"
+            if progress_visible:
+                try:
+                    await interaction.edit_original_response(embed=self._purge_embed(job, title, note), view=None)
+                except (discord.HTTPException, aiohttp.ClientError) as e:
+                    logger.info(f"Could not post purge result in {channel.id}: {e}")
+        finally:
+            if writer is not None:
+                writer.close()
+    
+    def _purge_embed(self, job, title: str, note: str = "") -> discord.Embed:
+        failed = f", {job.failed} failed" if job.failed else ""
+        return discord.Embed(
+            title=title,
+            description=(
+                f"Deleted {job.deleted} of up to {job.limit} message(s){failed}\n"
+                f"Scanned {job.scanned} message(s) in {int(job.elapsed)}s"
+                + (f"; stopped after it {job.stop_reason}" if job.stop_reason else "")
+                + f"\n**Filters:** {job.filters.describe()}{note}"
             ),
-            ephemeral=True
+            color=self.bot.config.embed_color
         )
+    
+    async def _send_purge_log(self, interaction: discord.Interaction, log_channel, writer, job) -> str:
+        """Upload the transcript to the log channel; returns a note for the moderator if it failed"""
+        try:
+            parts = writer.finish()
+            
+            embed = discord.Embed(
+                title="Purge Log",
+                description=(
+                    f"**Moderator:** {interaction.user.mention}\n"
+                    f"**Channel:** {interaction.channel.mention}\n"
+                    f"**Messages Deleted:** {job.deleted}\n"
+                    f"**Filters:** {job.filters.describe()}"
+                    + ("\n**Cancelled early**" if job.cancelled else "")
+                ),
+                color=self.bot.config.embed_color,
+                timestamp=datetime.utcnow()
+            )
+            if len(parts) > 1:
+                embed.set_footer(text=f"Transcript split into {len(parts)} files")
+            
+            # One file per message: the upload limit covers the whole request
+            for i, (fp, filename) in enumerate(parts):
+                await log_channel.send(embed=embed if i == 0 else None, file=discord.File(fp, filename=filename))
+        except discord.HTTPException as e:
+            logger.warning(f"Could not upload purge transcript to {log_channel.id} in guild {interaction.guild_id}: {e}")
+            return f"\n\nThe transcript could not be posted to {log_channel.mention}: {e.text or e.status}"
+        except aiohttp.ClientError as e:
+            logger.warning(f"Could not upload purge transcript to {log_channel.id} in guild {interaction.guild_id}: {e}")
+            return f"\n\nThe transcript could not be posted to {log_channel.mention}."
+        except TranscriptError as e:
+            logger.error(f"Could not write purge transcript for guild {interaction.guild_id}: {e}")
+            return "\n\nThe transcript could not be written."
+        
+        return ""
+
+class PurgeView(discord.ui.View):
+    def __init__(self, job, moderator_id):
+        super().__init__(timeout=None)
+        self.job = job
+        self.moderator_id = moderator_id
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.moderator_id:
+            await interaction.response.send_message("Only the moderator running this purge can cancel it.", ephemeral=True)
+            return False
+        return True
+    
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.job.cancel()
+        button.disabled = True
+        button.label = "Cancelling..."
+        await interaction.response.edit_message(view=self)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
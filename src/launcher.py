@@ -0,0 +1,118 @@
+"""Run Janitor Bot as several processes, each with its own range of shards.
+
+    python launcher.py --processes 4
+
+Every process is a normal ``main.py`` started with ``--shard-ids``, so
+gateway parsing, cogs and database calls spread over that many cores.
+The launcher also runs the Unix-socket coordinator the processes use to
+collect bot-wide stats and broadcast cog reloads, and restarts a process
+if it exits unexpectedly.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+from discord.http import HTTPClient
+
+from utils.cluster import ClusterCoordinator, split_shards
+from utils.config import Config
+from utils.logger import setup_logger, stop_logging
+
+logger = logging.getLogger("JanitorBot.launcher")
+
+async def recommended_shards(token: str) -> int:
+    http = HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+class Launcher:
+    def __init__(self, config: Config, shard_count: int, processes: int, extra_args):
+        self.config = config
+        self.shard_ranges = split_shards(shard_count, processes)
+        self.shard_count = shard_count
+        self.extra_args = extra_args
+        self.coordinator = ClusterCoordinator(config.cluster_socket_path, timeout=config.cluster_timeout_seconds)
+        self.children = {}
+        self.stopping = False
+
+    async def _supervise(self, cluster_id: int, shard_ids):
+        shard_spec = f"{shard_ids[0]}-{shard_ids[-1]}"
+        failures = 0
+
+        while not self.stopping:
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "main.py",
+                "--shard-count", str(self.shard_count),
+                "--shard-ids", shard_spec,
+                "--cluster-id", str(cluster_id),
+                "--cluster-count", str(len(self.shard_ranges)),
+                "--cluster-socket", str(self.coordinator.socket_path),
+                *self.extra_args
+            )
+            self.children[cluster_id] = process
+            logger.info(f"Cluster {cluster_id} started (pid {process.pid}, shards {shard_spec})")
+
+            code = await process.wait()
+            if self.stopping:
+                break
+
+            # Back off if the process keeps dying right after it starts
+            failures = failures + 1 if time.monotonic() - started < 60 else 0
+            delay = min(5 * 2 ** failures, 300)
+            logger.error(f"Cluster {cluster_id} exited with code {code}; restarting in {delay}s")
+            await asyncio.sleep(delay)
+
+    async def run(self):
+        await self.coordinator.start()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        try:
+            await asyncio.gather(*(
+                self._supervise(cluster_id, shard_ids)
+                for cluster_id, shard_ids in enumerate(self.shard_ranges)
+            ))
+        finally:
+            await self.coordinator.close()
+
+    def stop(self):
+        logger.info("Stopping clusters...")
+        self.stopping = True
+        for process in self.children.values():
+            if process.returncode is None:
+                process.send_signal(signal.SIGINT)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run Janitor Bot across several processes")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Bot processes to start")
+    parser.add_argument('--shards', type=int, help="Total shard count (default: sharding.shard_count or Discord's recommendation)")
+    args, extra_args = parser.parse_known_args()
+
+    config = Config()
+    setup_logger(
+        level=getattr(logging, config.log_level),
+        log_dir=config.log_directory,
+        file_stem="launcher",
+        json_format=config.log_format == "json"
+    )
+    shard_count = args.shards or config.shard_count or await recommended_shards(config.token)
+    logger.info(f"Launching {shard_count} shard(s) across {min(args.processes, shard_count)} process(es)")
+
+    try:
+        await Launcher(config, shard_count, args.processes, extra_args).run()
+    finally:
+        stop_logging()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,57 +1,368 @@
+import time
+
+PROCESS_STARTED = time.perf_counter()
+
+import argparse
 import asyncio
+import logging
 import discord
+from discord import app_commands
 from discord.ext import commands
+from discord.webhook.async_ import async_context
 from pathlib import Path
 import json
-import time
+import math
+import resource
+from typing import List, Optional
 
 from utils.config import Config
-from utils.database import Database
-from utils.logger import setup_logger
+from utils.async_database import AsyncDatabase
+from utils.cluster import ClusterClient, parse_shard_ids
+from utils.scheduler import Scheduler
+from utils.member_index import MemberIndex
+from utils.resolver import UserResolver
+from utils.command_sync import CommandSyncer
+from utils.guild_settings import GuildSettingsStore
+from utils.storage import open_storage
+from utils.logger import bind_log_context, setup_logger, stop_logging
+from utils.metrics import CommandMetrics, MetricsServer
+from utils.rest import RestScheduler
 
-logger = setup_logger()
+IMPORTS_DONE = time.perf_counter()
 
-class JanitorBot(commands.Bot):
-    def __init__(self):
-        intents = discord.Intents.all()
-        intents.members = True
-        intents.message_content = True
+logger = logging.getLogger("JanitorBot")
+
+class JanitorTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs in the same task as the command, so its log records get these fields
+        command = interaction.command.qualified_name if interaction.command else None
+        bind_log_context(guild_id=interaction.guild_id, command=command)
+        # Cogs declare how urgent their REST calls are (utils/rest.py)
+        cog = getattr(interaction.command, 'binding', None)
+        self.client.rest.set_priority(getattr(cog, 'rest_priority', None))
+        return True
+    
+    async def _call(self, interaction: discord.Interaction):
+        if interaction.type is discord.InteractionType.autocomplete:
+            return await super()._call(interaction)
+        
+        metrics = self.client.metrics
+        invocation = metrics.begin()
+        failed = True
+        try:
+            await super()._call(interaction)
+            failed = interaction.command_failed
+        finally:
+            name = interaction.command.qualified_name if interaction.command else interaction.data.get('name', 'unknown')
+            metrics.finish(name, invocation, failed)
+
+class JanitorBot(commands.AutoShardedBot):
+    def __init__(
+        self,
+        force_sync: bool = False,
+        sync_guild_ids: Optional[List[int]] = None,
+        shard_count: Optional[int] = None,
+        shard_ids: Optional[List[int]] = None,
+        cluster_id: Optional[int] = None,
+        cluster_count: Optional[int] = None,
+        cluster_socket: Optional[str] = None
+    ):
+        config = Config()
+        # launcher.py passes each process its shards; otherwise config.json decides
+        shard_count = shard_count or config.shard_count
+        if shard_ids is None and config.shard_ids is not None:
+            shard_ids = list(config.shard_ids)
+        
+        # Defaults plus whatever gateway.intents turns on or off
+        intents = discord.Intents.default()
+        for name, enabled in config.intents.items():
+            setattr(intents, name, enabled)
+        
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        for name, enabled in config.member_cache.items():
+            setattr(member_cache_flags, name, enabled)
+        
+        rest = RestScheduler(
+            # Discord's global limit is per bot token, so launcher.py's processes split it
+            global_rate=config.rest_global_rate / (cluster_count or 1),
+            shed_queue_depth=config.rest_shed_queue_depth,
+            cosmetic_max_delay=config.rest_cosmetic_max_delay_seconds
+        )
         
         super().__init__(
             command_prefix=commands.when_mentioned_or('v', 'V'),
             intents=intents,
-            help_command=None
+            member_cache_flags=member_cache_flags,
+            chunk_guilds_at_startup=config.chunk_guilds_at_startup,
+            # None lets Discord recommend a shard count
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            help_command=None,
+            tree_cls=JanitorTree,
+            # Lets the REST scheduler read rate limit headers and count 429s
+            http_trace=rest.trace_config()
         )
         
-        self.config = Config()
-        self.db = Database()
+        self.config = config
+        self.rest = rest
+        self.cluster_id = cluster_id
+        setup_logger(
+            level=getattr(logging, self.config.log_level),
+            log_dir=self.config.log_directory,
+            # Processes must not rotate each other's files
+            file_stem="bot" if cluster_id is None else f"bot-{cluster_id}",
+            json_format=self.config.log_format == 'json',
+            max_bytes=self.config.log_max_bytes,
+            backup_count=self.config.log_backup_count,
+            when=self.config.log_rotate_when,
+            compress=self.config.log_compress
+        )
+        self.db = AsyncDatabase(
+            open_storage(self.config),
+            cache_size=self.config.database_cache_size
+        )
+        self.scheduler = Scheduler(self.db, owns=self.owns_guild, wait_ready=self.wait_until_ready)
+        self.member_index = MemberIndex()
+        self.resolver = UserResolver(
+            self,
+            maxsize=self.config.user_cache_size,
+            ttl=self.config.user_cache_ttl_seconds,
+            not_found_ttl=self.config.user_cache_not_found_ttl_seconds,
+            member_ttl=self.config.user_cache_member_ttl_seconds
+        )
+        self.settings = GuildSettingsStore(
+            self.config,
+            path=self.config.guild_settings_path,
+            flush_delay_ms=self.config.guild_settings_flush_delay_ms
+        )
+        self.metrics = CommandMetrics()
+        self.metrics.instrument_http(self.http)
+        self.rest.install(self.http, self.metrics.webhook_adapter)
+        self.metrics_server = None
+        self.force_sync = force_sync
+        self.sync_guild_ids = sync_guild_ids or list(self.config.dev_guild_ids)
         self.start_time = time.time()
-        
+        self.startup_timings = {'imports': IMPORTS_DONE - PROCESS_STARTED}
+        # shard_id -> when its current gateway session started
+        self.shard_connected_at = {}
+        self.config_watcher = None
+        self.cluster = ClusterClient(cluster_socket, cluster_id) if cluster_socket else None
+    
+    @property
+    def is_primary(self) -> bool:
+        """True in a standalone bot and in cluster 0, which runs the once-per-bot jobs"""
+        return not self.cluster_id
+    
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this process runs the shard that ``guild_id`` lives on"""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+    
     async def setup_hook(self):
+        # Interaction responses go through this adapter rather than bot.http.
+        # setup_hook runs in the task that later starts the gateway, so every
+        # task spawned from there (slash commands, button and modal callbacks)
+        # inherits it and is queued by self.rest and counted by self.metrics
+        async_context.set(self.metrics.webhook_adapter)
+        
         logger.info("Loading cogs...")
         
         cog_folders = ['cogs.admin', 'cogs.moderation', 'cogs.fun', 'cogs.info', 'cogs.games', 'cogs.customize']
         
-        for folder in cog_folders:
+        # Cogs don't depend on each other, so their setup/cog_load awaits can overlap.
+        # Module imports still run one at a time.
+        started = time.perf_counter()
+        cog_times = await asyncio.gather(*(self._load_cog(folder) for folder in cog_folders))
+        self.startup_timings['cogs'] = time.perf_counter() - started
+        
+        # After the cogs, which register the job handlers
+        await self.scheduler.start()
+        
+        started = time.perf_counter()
+        # Every process has the same tree; one upload is enough
+        if self.is_primary:
+            await self.sync_commands()
+        self.startup_timings['sync'] = time.perf_counter() - started
+        
+        slowest = sorted(zip(cog_folders, cog_times), key=lambda item: item[1], reverse=True)
+        logger.info(
+            f"Startup: imports {self.startup_timings['imports'] * 1000:.0f}ms, "
+            f"cogs {self.startup_timings['cogs'] * 1000:.0f}ms "
+            f"({', '.join(f'{name[5:]} {seconds * 1000:.0f}ms' for name, seconds in slowest)}), "
+            f"sync {self.startup_timings['sync'] * 1000:.0f}ms"
+        )
+        
+        if self.config.metrics_port:
+            port = self.config.metrics_port + (self.cluster_id or 0)
+            self.metrics_server = MetricsServer([self.metrics, self.rest], self.config.metrics_host, port)
             try:
-                await self.load_extension(folder)
-                logger.info(f"Loaded {folder}")
-            except Exception as e:
-                logger.error(f"Failed to load {folder}: {e}")
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint: {e}")
+                self.metrics_server = None
+        
+        if self.config.config_watch_seconds > 0:
+            self.config_watcher = asyncio.create_task(
+                self.config.watch(self.config.config_watch_seconds)
+            )
+        
+        if self.cluster:
+            self.cluster.register('stats', self.process_stats)
+            self.cluster.register('reload', self._reload_for_cluster)
+            self.cluster.start()
+    
+    async def process_stats(self) -> dict:
+        """Numbers for this process; /clusterstats adds them up across processes"""
+        return {
+            'shards': sorted(self.shards),
+            'guilds': len(self.guilds),
+            'members': sum(guild.member_count or 0 for guild in self.guilds),
+            'latency_ms': round(self.latency * 1000) if math.isfinite(self.latency) else None,
+            # ru_maxrss is in KiB on Linux
+            'memory_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+            'commands': sum(stats.duration.count for stats in self.metrics.commands.values()),
+            'uptime': int(time.time() - self.start_time)
+        }
+    
+    async def _reload_for_cluster(self, extension: str) -> dict:
+        await self.reload_extension(extension)
+        logger.info(f"Reloaded {extension}")
+        return {'extension': extension}
+    
+    async def broadcast(self, command: str, **args) -> List[dict]:
+        """Run a cluster command in every bot process, or just this one when not clustered"""
+        if self.cluster:
+            return await self.cluster.broadcast(command, **args)
         
+        handler = {'stats': self.process_stats, 'reload': self._reload_for_cluster}[command]
         try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} slash commands")
+            return [{'cluster_id': 0, 'data': await handler(**args)}]
         except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+            return [{'cluster_id': 0, 'error': str(e)}]
+    
+    async def _load_cog(self, folder: str) -> float:
+        started = time.perf_counter()
+        try:
+            await self.load_extension(folder)
+            logger.info(f"Loaded {folder}")
+        except Exception as e:
+            logger.error(f"Failed to load {folder}: {e}")
+        return time.perf_counter() - started
+    
+    async def sync_commands(self):
+        syncer = CommandSyncer(self.tree, self.config.command_sync_path)
+        # Dev guilds get the global commands copied in; they update instantly
+        guilds = [discord.Object(id=guild_id) for guild_id in self.sync_guild_ids] or [None]
+        
+        for guild in guilds:
+            if guild:
+                self.tree.copy_global_to(guild=guild)
+            scope = f"guild {guild.id}" if guild else "global"
+            try:
+                synced = await syncer.sync(guild=guild, force=self.force_sync)
+                if synced is not None:
+                    logger.info(f"Synced {synced} slash commands ({scope})")
+            except Exception as e:
+                logger.error(f"Failed to sync commands ({scope}): {e}")
+    
+    async def close(self):
+        if self.cluster:
+            await self.cluster.close()
+        if self.config_watcher:
+            self.config_watcher.cancel()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
+        await self.scheduler.close()
+        await self.settings.close()
+        await self.db.close()
+        stop_logging()
+    
+    async def on_shard_ready(self, shard_id: int):
+        self.shard_connected_at[shard_id] = time.time()
+        logger.info(f"Shard {shard_id} ready")
+    
+    async def on_shard_resumed(self, shard_id: int):
+        self.shard_connected_at.setdefault(shard_id, time.time())
+        logger.info(f"Shard {shard_id} resumed")
+    
+    async def on_shard_disconnect(self, shard_id: int):
+        self.shard_connected_at.pop(shard_id, None)
+        logger.warning(f"Shard {shard_id} disconnected")
+    
+    def shard_guild_counts(self):
+        counts = {shard_id: 0 for shard_id in self.shards}
+        for guild in self.guilds:
+            counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+        return counts
+    
+    # Keep member name indexes (built on first search) and the user
+    # resolver's cache in step with the gateway
+    async def on_member_join(self, member: discord.Member):
+        self.member_index.member_updated(member)
+        self.resolver.forget(member.id, member.guild.id)
+    
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.nick != after.nick:
+            self.member_index.member_updated(after)
+        self.resolver.forget(after.id, after.guild.id)
+    
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.name != after.name or before.global_name != after.global_name:
+            self.member_index.user_updated(after)
+        self.resolver.forget(after.id)
+    
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        self.member_index.member_removed(payload.guild_id, payload.user.id)
+        self.resolver.forget(payload.user.id, payload.guild_id)
+    
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.member_index.drop(guild.id)
     
     async def on_ready(self):
         logger.info(f'Logged in as {self.user.name} ({self.user.id})')
-        logger.info(f'Connected to {len(self.guilds)} guilds')
+        logger.info(f'Connected to {len(self.guilds)} guilds on {len(self.shards)} shard(s)')
         logger.info('Bot is ready!')
+        
+        # on_ready fires again after reconnects; only the first one is startup
+        if 'ready' not in self.startup_timings:
+            self.startup_timings['ready'] = time.perf_counter() - PROCESS_STARTED
+            logger.info(f"Ready {self.startup_timings['ready']:.2f}s after process start")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run Janitor Bot")
+    parser.add_argument(
+        '--force-sync',
+        action='store_true',
+        help="Sync slash commands even if the command tree has not changed"
+    )
+    parser.add_argument(
+        '--sync-guild',
+        type=int,
+        action='append',
+        metavar='GUILD_ID',
+        help="Sync commands to this guild instead of globally (repeatable; overrides commands.dev_guild_ids)"
+    )
+    # Set by launcher.py for each process it starts
+    parser.add_argument('--shard-count', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--shard-ids', type=parse_shard_ids, help=argparse.SUPPRESS)
+    parser.add_argument('--cluster-id', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--cluster-count', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--cluster-socket', help=argparse.SUPPRESS)
+    return parser.parse_args()
 
 async def main():
-    bot = JanitorBot()
+    args = parse_args()
+    bot = JanitorBot(
+        force_sync=args.force_sync,
+        sync_guild_ids=args.sync_guild,
+        shard_count=args.shard_count,
+        shard_ids=args.shard_ids,
+        cluster_id=args.cluster_id,
+        cluster_count=args.cluster_count,
+        cluster_socket=args.cluster_socket
+    )
     
     try:
         await bot.start(bot.config.token)
@@ -0,0 +1,190 @@
+import asyncio
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.cache import LRUCache
+from utils.storage import ScheduledJob, StorageBackend
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+def _set_exception(future: asyncio.Future, exc: BaseException):
+    if not future.done():
+        future.set_exception(exc)
+
+class AsyncDatabase:
+    """Awaitable facade over a StorageBackend.
+
+    Every call is handed to a single worker thread through a queue, so disk
+    I/O never runs on the event loop. Scripts that have no event loop can
+    keep using the wrapped backend (available as ``sync``) directly.
+
+    Duel stats and custom-role lists are served from an LRU cache on the
+    event loop when possible; writes made through this facade update or
+    invalidate the affected entries.
+    """
+
+    def __init__(self, db: StorageBackend, cache_size: int = 1024):
+        self.sync = db
+        self.cache = LRUCache(cache_size)
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._worker,
+            name="DatabaseWorker",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _worker(self):
+        # With write-behind or idle partitions to close, the worker wakes up
+        # at least once per maintenance interval even when no requests arrive.
+        timeout = self.sync.maintenance_interval
+
+        while True:
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self.sync.run_maintenance()
+                continue
+
+            if request is None:
+                break
+
+            loop, future, func, args = request
+            try:
+                result = func(*args)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, result)
+
+            if timeout is not None:
+                self.sync.run_maintenance()
+
+    async def _run(self, func, *args):
+        if self._closed:
+            raise RuntimeError("Database is closed")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((loop, future, func, args))
+        return await future
+
+    async def flush(self):
+        return await self._run(self.sync.flush)
+
+    async def close(self):
+        """Drain queued requests, stop the worker, flush and close the connection"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(None)
+        await asyncio.to_thread(self._thread.join)
+        self.sync.close()
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.cache.stats()
+
+    async def get_duel_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        key = ('duel', guild_id, user_id)
+        stats = self.cache.get(key)
+        if stats is None:
+            stats = await self._run(self.sync.get_duel_stats, guild_id, user_id)
+            self.cache.set(key, stats)
+        return dict(stats)
+
+    async def get_many_duel_stats(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        stats = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = self.cache.get(('duel', guild_id, user_id))
+            if cached is None:
+                missing.append(user_id)
+            else:
+                stats[user_id] = dict(cached)
+
+        if missing:
+            fetched = await self._run(self.sync.get_many_duel_stats, guild_id, missing)
+            for user_id, user_stats in fetched.items():
+                self.cache.set(('duel', guild_id, user_id), user_stats)
+                stats[user_id] = dict(user_stats)
+
+        return stats
+
+    async def update_duel_stats(self, guild_id: int, user_id: int, won: bool = False):
+        key = ('duel', guild_id, user_id)
+        self.cache.invalidate(key)
+        try:
+            return await self._run(self.sync.update_duel_stats, guild_id, user_id, won)
+        finally:
+            self.cache.invalidate(key)
+
+    async def record_duel_result(
+        self,
+        guild_id: int,
+        winner_id: int,
+        loser_id: int
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        self.cache.invalidate(('duel', guild_id, winner_id))
+        self.cache.invalidate(('duel', guild_id, loser_id))
+        winner_stats, loser_stats = await self._run(
+            self.sync.record_duel_result, guild_id, winner_id, loser_id
+        )
+        self.cache.set(('duel', guild_id, winner_id), winner_stats)
+        self.cache.set(('duel', guild_id, loser_id), loser_stats)
+        return dict(winner_stats), dict(loser_stats)
+
+    async def get_duel_leaderboard(self, guild_id: int, limit: int = 5, offset: int = 0):
+        return await self._run(self.sync.get_duel_leaderboard, guild_id, limit, offset)
+
+    async def count_ranked_duelists(self, guild_id: int) -> int:
+        return await self._run(self.sync.count_ranked_duelists, guild_id)
+
+    async def get_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        return await self._run(self.sync.get_rank, guild_id, user_id)
+
+    async def get_user_custom_roles(self, guild_id: int, user_id: int):
+        key = ('roles', guild_id, user_id)
+        roles = self.cache.get(key)
+        if roles is None:
+            roles = await self._run(self.sync.get_user_custom_roles, guild_id, user_id)
+            self.cache.set(key, roles)
+        return list(roles)
+
+    async def add_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        key = ('roles', guild_id, user_id)
+        self.cache.invalidate(key)
+        try:
+            return await self._run(self.sync.add_custom_role, guild_id, user_id, role_id)
+        finally:
+            self.cache.invalidate(key)
+
+    async def remove_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        key = ('roles', guild_id, user_id)
+        self.cache.invalidate(key)
+        try:
+            return await self._run(self.sync.remove_custom_role, guild_id, user_id, role_id)
+        finally:
+            self.cache.invalidate(key)
+
+    async def count_user_custom_roles(self, guild_id: int, user_id: int) -> int:
+        return len(await self.get_user_custom_roles(guild_id, user_id))
+
+    async def add_scheduled_job(self, guild_id: int, kind: str, key: str, due_at: float, payload: dict) -> int:
+        return await self._run(self.sync.add_scheduled_job, guild_id, kind, key, due_at, payload)
+
+    async def cancel_scheduled_job(self, guild_id: int, kind: str, key: str) -> bool:
+        return await self._run(self.sync.cancel_scheduled_job, guild_id, kind, key)
+
+    async def get_scheduled_job(self, job_id: int) -> Optional[ScheduledJob]:
+        return await self._run(self.sync.get_scheduled_job, job_id)
+
+    async def delete_scheduled_job(self, job_id: int):
+        return await self._run(self.sync.delete_scheduled_job, job_id)
+
+    async def get_scheduled_job_times(self) -> List[Tuple[float, int, int]]:
+        return await self._run(self.sync.get_scheduled_job_times)
@@ -0,0 +1,123 @@
+import asyncio
+import gzip
+import logging
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+logger = logging.getLogger("JanitorBot.backup")
+
+@dataclass
+class BackupReport:
+    path: Path
+    files: List[Path] = field(default_factory=list)
+    pages: int = 0
+    bytes_copied: int = 0
+    compressed_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Megabytes of database pages copied per second"""
+        if not self.seconds:
+            return 0.0
+        return self.bytes_copied / self.seconds / 1_000_000
+
+def _backup_file(source: Path, destination: Path, pages_per_step: int, step_delay: float):
+    """Copy one live database with SQLite's online backup API, then gzip it.
+
+    Runs in a worker thread. The backup copies ``pages_per_step`` pages at
+    a time and sleeps ``step_delay`` seconds between steps so the bot's own
+    connection keeps getting the disk. Returns (pages, page_size).
+    """
+    temp_path = destination.with_suffix(".tmp")
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(temp_path)
+    try:
+        def progress(status, remaining, total):
+            if remaining and step_delay:
+                time.sleep(step_delay)
+
+        src.backup(dst, pages=pages_per_step, progress=progress)
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        page_size = dst.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+
+    try:
+        with open(temp_path, 'rb') as f_in, gzip.open(destination, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+    return page_count, page_size
+
+def _rotate(directory: Path, keep: int):
+    snapshots = sorted(p for p in directory.iterdir() if p.is_dir() and p.name.startswith("snapshot-"))
+    for old in snapshots[:-keep] if keep > 0 else []:
+        shutil.rmtree(old, ignore_errors=True)
+
+def _new_snapshot_dir(root: Path) -> Path:
+    """Create a snapshot directory that no other backup is writing to.
+
+    Names carry microseconds, and ``mkdir`` without ``exist_ok`` fails on
+    a directory another backup (a /backup next to the scheduled run, or
+    another bot process) already claimed, so a counter is added instead.
+    """
+    name = f"snapshot-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    for attempt in range(1, 100):
+        target = root / (name if attempt == 1 else f"{name}-{attempt}")
+        try:
+            target.mkdir()
+            return target
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No free snapshot directory name under {root}")
+
+async def create_snapshot(
+    db,
+    directory: str = "backups",
+    keep: int = 7,
+    pages_per_step: int = 256,
+    step_delay_ms: int = 10
+) -> BackupReport:
+    """Write a compressed snapshot of every database file behind ``db``.
+
+    ``db`` is the bot's AsyncDatabase. Pending write-behind updates are
+    flushed first. Each file is copied in its own thread, so the event loop
+    keeps running for the whole backup. Snapshots older than the newest
+    ``keep`` are deleted afterwards.
+    """
+    await db.flush()
+
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    target = _new_snapshot_dir(root)
+
+    report = BackupReport(path=target)
+    started = time.perf_counter()
+
+    for source in db.sync.database_files():
+        destination = target / f"{source.name}.gz"
+        pages, page_size = await asyncio.to_thread(
+            _backup_file, source, destination, pages_per_step, step_delay_ms / 1000
+        )
+        report.files.append(destination)
+        report.pages += pages
+        report.bytes_copied += pages * page_size
+        report.compressed_bytes += destination.stat().st_size
+
+    report.seconds = time.perf_counter() - started
+    await asyncio.to_thread(_rotate, root, keep)
+
+    logger.info(
+        f"Backup {target.name}: {len(report.files)} file(s), {report.pages} pages, "
+        f"{report.bytes_copied / 1_000_000:.1f}MB -> {report.compressed_bytes / 1_000_000:.1f}MB "
+        f"in {report.seconds:.2f}s ({report.throughput:.1f}MB/s)"
+    )
+    return report
@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry when full.
+
+    A maxsize of 0 disables caching: every lookup is a miss and nothing is
+    stored.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 0:
+            raise ValueError("maxsize must be >= 0")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.maxsize:
+            return
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire ``ttl`` seconds after being set.
+
+    ``set`` takes a per-entry ``ttl``, so short-lived entries (such as
+    "not found" results) can share the cache with normal ones.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING and entry[0] <= time.monotonic():
+            del self._data[key]
+            entry = _MISSING
+
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        super().set(key, (expires_at, value))
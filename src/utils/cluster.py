@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import json
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("JanitorBot.cluster")
+
+# Messages are newline-delimited JSON objects. A bot process may send:
+#   {"op": "hello", "cluster_id": 0}
+#   {"op": "broadcast", "id": 1, "command": "stats", "args": {}}
+#   {"op": "reply", "id": 7, "data": {...}} or {"op": "reply", "id": 7, "error": "..."}
+# The coordinator sends:
+#   {"op": "command", "id": 7, "command": "stats", "args": {}}
+#   {"op": "result", "id": 1, "results": [{"cluster_id": 0, "data": {...}}, ...]}
+
+# Guild lists and stats can be large; raise asyncio's 64KiB line limit
+STREAM_LIMIT = 16 * 1024 * 1024
+
+def split_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """Contiguous, nearly equal shard ranges, one per process"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+def parse_shard_ids(value: str) -> List[int]:
+    """Parse "0-3" or "0,2,5" (or a mix) into shard IDs"""
+    shard_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-', 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+async def _send(writer: asyncio.StreamWriter, message: dict):
+    writer.write(json.dumps(message, default=str).encode('utf-8') + b"\n")
+    await writer.drain()
+
+class ClusterCoordinator:
+    """Unix-socket hub the launcher runs for its bot processes.
+
+    Forwards a broadcast from one process to every connected process and
+    sends the combined replies back to the sender. Processes that do not
+    answer within ``timeout`` seconds are reported with an error.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.clients: Dict[int, asyncio.StreamWriter] = {}
+        self._pending: Dict[int, Dict[int, asyncio.Future]] = {}
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path), limit=STREAM_LIMIT)
+        logger.info(f"Cluster coordinator listening on {self.socket_path}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in self.clients.values():
+            writer.close()
+        self.socket_path.unlink(missing_ok=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message.get('op')
+
+                if op == 'hello':
+                    cluster_id = message['cluster_id']
+                    self.clients[cluster_id] = writer
+                    logger.info(f"Cluster {cluster_id} connected")
+                elif op == 'broadcast':
+                    asyncio.create_task(self._broadcast(writer, message))
+                elif op == 'reply':
+                    future = self._pending.get(message['id'], {}).get(cluster_id)
+                    if future and not future.done():
+                        future.set_result(message)
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"Cluster {cluster_id} connection error: {e}")
+        finally:
+            if cluster_id is not None and self.clients.get(cluster_id) is writer:
+                del self.clients[cluster_id]
+                logger.warning(f"Cluster {cluster_id} disconnected")
+            writer.close()
+
+    async def _broadcast(self, origin: asyncio.StreamWriter, message: dict):
+        request_id = next(self._ids)
+        loop = asyncio.get_running_loop()
+        targets = dict(self.clients)
+        waiting = self._pending[request_id] = {cluster_id: loop.create_future() for cluster_id in targets}
+
+        for cluster_id, writer in targets.items():
+            try:
+                await _send(writer, {
+                    'op': 'command',
+                    'id': request_id,
+                    'command': message['command'],
+                    'args': message.get('args', {})
+                })
+            except ConnectionError:
+                waiting[cluster_id].set_result({'error': "disconnected"})
+
+        done, _ = await asyncio.wait(waiting.values(), timeout=self.timeout) if waiting else (set(), set())
+        del self._pending[request_id]
+
+        results = []
+        for cluster_id, future in sorted(waiting.items()):
+            reply = future.result() if future in done else {'error': "timed out"}
+            results.append({'cluster_id': cluster_id, **{k: v for k, v in reply.items() if k in ('data', 'error')}})
+
+        try:
+            await _send(origin, {'op': 'result', 'id': message['id'], 'results': results})
+        except ConnectionError:
+            pass  # The requesting process went away; nobody is waiting for this
+
+class ClusterClient:
+    """A bot process's connection to the launcher's coordinator.
+
+    ``handlers`` maps command names to coroutines that take the broadcast
+    args as keyword arguments and return JSON-serializable data.
+    """
+
+    def __init__(self, socket_path: str, cluster_id: int):
+        self.socket_path = socket_path
+        self.cluster_id = cluster_id
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, command: str, handler: Callable[..., Awaitable[Any]]):
+        self.handlers[command] = handler
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass  # Already gone; closing is all we wanted
+
+    async def _run(self):
+        delay = 1
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LIMIT)
+                await _send(self._writer, {'op': 'hello', 'cluster_id': self.cluster_id})
+                delay = 1
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    if message.get('op') == 'command':
+                        asyncio.create_task(self._run_command(message))
+                    elif message.get('op') == 'result':
+                        future = self._pending.pop(message['id'], None)
+                        if future and not future.done():
+                            future.set_result(message['results'])
+            except (ConnectionError, FileNotFoundError, json.JSONDecodeError) as e:
+                logger.warning(f"Lost connection to cluster coordinator: {e}")
+
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Cluster coordinator disconnected"))
+            self._pending.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _run_command(self, message: dict):
+        handler = self.handlers.get(message['command'])
+        try:
+            if handler is None:
+                raise LookupError(f"Unknown cluster command: {message['command']}")
+            reply = {'data': await handler(**message.get('args', {}))}
+        except Exception as e:
+            logger.error(f"Cluster command {message['command']} failed: {e}")
+            reply = {'error': str(e)}
+
+        if self._writer:
+            await _send(self._writer, {'op': 'reply', 'id': message['id'], **reply})
+
+    async def broadcast(self, command: str, **args) -> List[dict]:
+        """Run ``command`` in every process (this one included).
+
+        Returns one ``{"cluster_id", "data"}`` or ``{"cluster_id", "error"}``
+        dict per process.
+        """
+        if self._writer is None:
+            raise ConnectionError("Not connected to the cluster coordinator")
+
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        await _send(self._writer, {'op': 'broadcast', 'id': request_id, 'command': command, 'args': args})
+        return await future
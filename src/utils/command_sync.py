@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import discord
+
+from utils.helpers import write_atomic
+
+logger = logging.getLogger("JanitorBot.sync")
+
+def tree_hash(tree: discord.app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """SHA-256 of the payload ``tree.sync(guild=guild)`` would upload"""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get('type', 1), c['name']))
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class CommandSyncer:
+    """Syncs the command tree only when it differs from the last upload.
+
+    Hashes are kept per application and scope ("global" or a guild ID)
+    in a small JSON file, so switching tokens or dev guilds still syncs.
+    """
+
+    def __init__(self, tree: discord.app_commands.CommandTree, path: str = "data/command_sync.json"):
+        self.tree = tree
+        self.path = Path(path)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {self.path}: {e}")
+            return {}
+
+    async def sync(self, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> Optional[int]:
+        """Sync one scope; returns how many commands were synced, or None if skipped"""
+        scope = f"{self.tree.client.application_id}:{guild.id if guild else 'global'}"
+        digest = tree_hash(self.tree, guild)
+
+        hashes = await asyncio.to_thread(self._load)
+        if not force and hashes.get(scope) == digest:
+            logger.info(f"Command tree unchanged for {scope}, skipping sync")
+            return None
+
+        synced = await self.tree.sync(guild=guild)
+        hashes[scope] = digest
+        await asyncio.to_thread(write_atomic, self.path, json.dumps(hashes, indent=2))
+        return len(synced)
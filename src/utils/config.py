@@ -1,79 +1,320 @@
+import asyncio
 import json
+import logging
 import discord
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger("JanitorBot.config")
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+LOG_FORMATS = ('text', 'json')
+LOG_ROTATIONS = ('midnight', 'hourly', 'none')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+DATABASE_BACKENDS = ('sqlite', 'memory')
+
+class ConfigError(ValueError):
+    """Raised when config.json fails validation"""
+
+class _Reader:
+    """Pulls typed values out of the raw config dict, collecting every problem"""
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.errors: List[str] = []
+
+    def get(self, section: Optional[str], key: str, default: Any, kind: type, minimum=None) -> Any:
+        source = self.data if section is None else self.data.get(section, {})
+        name = key if section is None else f"{section}.{key}"
+        if not isinstance(source, dict):
+            self.errors.append(f"{section} must be an object")
+            return default
+
+        value = source.get(key, default)
+        if value is None and default is None:
+            return None
+
+        if kind is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            self.errors.append(f"{name} must be of type {kind.__name__}, got {type(value).__name__}")
+            return default
+        if minimum is not None and value < minimum:
+            self.errors.append(f"{name} must be >= {minimum}")
+            return default
+
+        return value
+
+    def get_ids(self, section: str, key: str) -> Tuple[int, ...]:
+        values = self.get(section, key, [], list)
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            self.errors.append(f"{section}.{key} must be a list of IDs")
+            return ()
+        return tuple(values)
+
+    def get_flags(self, section: str, key: str, valid) -> Mapping[str, bool]:
+        flags = self.get(section, key, {}, dict)
+        for name, value in flags.items():
+            if name not in valid:
+                self.errors.append(f"{section}.{key}: unknown flag {name!r}")
+            elif not isinstance(value, bool):
+                self.errors.append(f"{section}.{key}.{name} must be true or false")
+        return MappingProxyType(dict(flags))
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Validated, immutable view of config.json.
+
+    Built once per load so hot paths (every embed reads ``embed_color``)
+    are plain attribute reads instead of nested dict lookups and hex
+    parsing.
+    """
+
+    token: str
+    genius_token: str
+    bot_info: Mapping[str, Any]
+    embed_color: discord.Color
+    birthday_role_id: int
+    protected_role_ids: Tuple[int, ...]
+    duel_cooldown: int
+    fork_cooldown_minutes: int
+    fork_timeout_minutes: int
+    purge_max: int
+    quote_scan_limit: int
+    quote_min_length: int
+    database_backend: str
+    database_path: str
+    database_synchronous: str
+    database_write_behind: bool
+    database_flush_interval_ms: int
+    database_flush_max_ops: int
+    database_cache_size: int
+    database_per_guild_files: bool
+    database_guild_directory: str
+    database_max_open_guilds: int
+    database_guild_idle_seconds: int
+    backup_directory: str
+    backup_keep: int
+    backup_interval_hours: float
+    backup_pages_per_step: int
+    backup_step_delay_ms: int
+    log_channel_id: Optional[int]
+    log_level: str
+    log_format: str
+    log_directory: str
+    log_max_bytes: int
+    log_rotate_when: Optional[str]
+    log_backup_count: int
+    log_compress: bool
+    guild_settings_path: str
+    guild_settings_flush_delay_ms: int
+    shard_count: Optional[int]
+    shard_ids: Optional[Tuple[int, ...]]
+    cluster_socket_path: str
+    cluster_timeout_seconds: float
+    intents: Mapping[str, bool]
+    member_cache: Mapping[str, bool]
+    chunk_guilds_at_startup: bool
+    user_cache_size: int
+    rest_global_rate: float
+    rest_shed_queue_depth: int
+    rest_cosmetic_max_delay_seconds: float
+    user_cache_ttl_seconds: float
+    user_cache_not_found_ttl_seconds: float
+    user_cache_member_ttl_seconds: float
+    command_sync_path: str
+    dev_guild_ids: Tuple[int, ...]
+    metrics_host: str
+    metrics_port: int
+    config_watch_seconds: float
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ConfigSnapshot':
+        if not isinstance(data, dict):
+            raise ConfigError("config.json must contain a JSON object")
+
+        r = _Reader(data)
+
+        color_hex = r.get('colors', 'primary', 'a84141', str)
+        try:
+            embed_color = discord.Color(int(color_hex.lstrip('#'), 16))
+        except ValueError:
+            r.errors.append(f"colors.primary is not a hex color: {color_hex!r}")
+            embed_color = discord.Color(0xa84141)
+
+        synchronous = r.get('database', 'synchronous', 'NORMAL', str).upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            r.errors.append(f"database.synchronous must be one of {', '.join(SYNCHRONOUS_MODES)}")
+
+        backend = r.get('database', 'backend', 'sqlite', str)
+        if backend not in DATABASE_BACKENDS:
+            r.errors.append(f"database.backend must be one of {', '.join(DATABASE_BACKENDS)}")
+
+        log_level = r.get('logging', 'level', 'INFO', str).upper()
+        if log_level not in LOG_LEVELS:
+            r.errors.append(f"logging.level must be one of {', '.join(LOG_LEVELS)}")
+
+        log_format = r.get('logging', 'format', 'text', str)
+        if log_format not in LOG_FORMATS:
+            r.errors.append(f"logging.format must be one of {', '.join(LOG_FORMATS)}")
+
+        rotate_when = r.get('logging', 'rotate_when', 'midnight', str)
+        if rotate_when not in LOG_ROTATIONS:
+            r.errors.append(f"logging.rotate_when must be one of {', '.join(LOG_ROTATIONS)}")
+
+        log_max_bytes = r.get('logging', 'max_bytes', 10_000_000, int, 0)
+        log_backup_count = r.get('logging', 'backup_count', 14, int, 0)
+        # With nothing to rotate into, the handler would reopen the same file
+        # on every rollover and never prune anything
+        if log_backup_count == 0 and (rotate_when != 'none' or log_max_bytes > 0):
+            r.errors.append("logging.backup_count must be at least 1 unless rotate_when is \"none\" and max_bytes is 0")
+
+        shard_count = r.get('sharding', 'shard_count', None, int, 1)
+        shard_ids = None
+        if r.get('sharding', 'shard_ids', None, list) is not None:
+            shard_ids = r.get_ids('sharding', 'shard_ids')
+            if shard_count is None:
+                r.errors.append("sharding.shard_ids requires sharding.shard_count")
+            elif any(not 0 <= shard_id < shard_count for shard_id in shard_ids):
+                r.errors.append(f"sharding.shard_ids must be between 0 and {shard_count - 1}")
+
+        snapshot = cls(
+            token=r.get(None, 'token', '', str),
+            genius_token=r.get(None, 'genius_token', '', str),
+            bot_info=MappingProxyType(dict(r.get(None, 'bot_info', {}, dict))),
+            embed_color=embed_color,
+            birthday_role_id=r.get('roles', 'birthday_role_id', 0, int, 0),
+            protected_role_ids=r.get_ids('roles', 'protected_role_ids'),
+            duel_cooldown=r.get('cooldowns', 'duel_seconds', 30, int, 0),
+            fork_cooldown_minutes=r.get('cooldowns', 'fork_minutes', 10, int, 0),
+            fork_timeout_minutes=r.get('cooldowns', 'fork_timeout_minutes', 5, int, 0),
+            purge_max=r.get('limits', 'purge_max', 350, int, 1),
+            quote_scan_limit=r.get('limits', 'quote_scan_limit', 2000, int, 1),
+            quote_min_length=r.get('limits', 'quote_min_length', 20, int, 0),
+            database_backend=backend,
+            database_path=r.get('database', 'path', 'data/bot.db', str),
+            database_synchronous=synchronous,
+            database_write_behind=r.get('database', 'write_behind', False, bool),
+            database_flush_interval_ms=r.get('database', 'flush_interval_ms', 250, int, 1),
+            database_flush_max_ops=r.get('database', 'flush_max_ops', 100, int, 1),
+            database_cache_size=r.get('database', 'cache_size', 1024, int, 0),
+            database_per_guild_files=r.get('database', 'per_guild_files', False, bool),
+            database_guild_directory=r.get('database', 'guild_directory', 'data/guilds', str),
+            database_max_open_guilds=r.get('database', 'max_open_guilds', 64, int, 1),
+            database_guild_idle_seconds=r.get('database', 'guild_idle_seconds', 300, int, 0),
+            backup_directory=r.get('backup', 'directory', 'backups', str),
+            backup_keep=r.get('backup', 'keep', 7, int, 1),
+            backup_interval_hours=r.get('backup', 'interval_hours', 24.0, float, 0),
+            backup_pages_per_step=r.get('backup', 'pages_per_step', 256, int, 1),
+            backup_step_delay_ms=r.get('backup', 'step_delay_ms', 10, int, 0),
+            log_channel_id=r.get('logging', 'log_channel_id', None, int),
+            log_level=log_level,
+            log_format=log_format,
+            log_directory=r.get('logging', 'directory', 'logs', str),
+            log_max_bytes=log_max_bytes,
+            log_rotate_when=None if rotate_when == 'none' else rotate_when,
+            log_backup_count=log_backup_count,
+            log_compress=r.get('logging', 'compress', True, bool),
+            guild_settings_path=r.get('guild_settings', 'path', 'data/guild_settings.json', str),
+            guild_settings_flush_delay_ms=r.get('guild_settings', 'flush_delay_ms', 500, int, 0),
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            cluster_socket_path=r.get('cluster', 'socket_path', 'data/cluster.sock', str),
+            cluster_timeout_seconds=r.get('cluster', 'timeout_seconds', 10.0, float, 0),
+            intents=r.get_flags('gateway', 'intents', discord.Intents.VALID_FLAGS),
+            member_cache=r.get_flags('gateway', 'member_cache', discord.MemberCacheFlags.VALID_FLAGS),
+            chunk_guilds_at_startup=r.get('gateway', 'chunk_guilds_at_startup', False, bool),
+            user_cache_size=r.get('user_cache', 'size', 4096, int, 0),
+            user_cache_ttl_seconds=r.get('user_cache', 'ttl_seconds', 300.0, float, 0),
+            user_cache_not_found_ttl_seconds=r.get('user_cache', 'not_found_ttl_seconds', 30.0, float, 0),
+            user_cache_member_ttl_seconds=r.get('user_cache', 'member_ttl_seconds', 30.0, float, 0),
+            rest_global_rate=r.get('rest', 'global_rate', 45.0, float, 1),
+            rest_shed_queue_depth=r.get('rest', 'shed_queue_depth', 100, int, 0),
+            rest_cosmetic_max_delay_seconds=r.get('rest', 'cosmetic_max_delay_seconds', 5.0, float, 0),
+            command_sync_path=r.get('commands', 'sync_state_path', 'data/command_sync.json', str),
+            dev_guild_ids=r.get_ids('commands', 'dev_guild_ids'),
+            metrics_host=r.get('metrics', 'host', '127.0.0.1', str),
+            metrics_port=r.get('metrics', 'port', 0, int, 0),
+            config_watch_seconds=r.get('reload', 'watch_seconds', 0.0, float, 0),
+        )
+
+        if r.errors:
+            raise ConfigError("Invalid config.json:\n- " + "\n- ".join(r.errors))
+        return snapshot
 
 class Config:
+    """Holds the current ConfigSnapshot and swaps it on reload.
+
+    Attribute access (``config.embed_color``) is forwarded to the current
+    snapshot, so a reload is a single reference swap that every reader
+    sees on its next access.
+    """
+
     def __init__(self, config_path: str = "config.json"):
         self.config_path = Path(config_path)
         self.data = self._load_config()
-    
+        self.snapshot = ConfigSnapshot.from_dict(self.data)
+        self._mtime = self._stat_mtime()
+
+    def __getattr__(self, name: str):
+        # Only called for names not found on Config itself
+        if name == 'snapshot':
+            raise AttributeError(name)
+        return getattr(self.snapshot, name)
+
     def _load_config(self) -> dict:
         if not self.config_path.exists():
             raise FileNotFoundError(f"Config file not found: {self.config_path}")
-        
+
         with open(self.config_path, 'r') as f:
             return json.load(f)
-    
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return self.config_path.stat().st_mtime
+        except OSError:
+            return None
+
     def save(self):
         with open(self.config_path, 'w') as f:
             json.dump(self.data, f, indent=2)
-    
-    @property
-    def token(self) -> str:
-        return self.data.get('token', '')
-    
-    @property
-    def genius_token(self) -> str:
-        return self.data.get('genius_token', '')
-    
-    @property
-    def bot_info(self) -> dict:
-        return self.data.get('bot_info', {})
-    
-    @property
-    def embed_color(self) -> discord.Color:
-        color_hex = self.data.get('colors', {}).get('primary', 'a84141')
-        return discord.Color(int(color_hex, 16))
-    
-    @property
-    def birthday_role_id(self) -> int:
-        return self.data.get('roles', {}).get('birthday_role_id', 0)
-    
-    @property
-    def duel_cooldown(self) -> int:
-        return self.data.get('cooldowns', {}).get('duel_seconds', 30)
-    
-    @property
-    def fork_cooldown_minutes(self) -> int:
-        return self.data.get('cooldowns', {}).get('fork_minutes', 10)
-    
-    @property
-    def fork_timeout_minutes(self) -> int:
-        return self.data.get('cooldowns', {}).get('fork_timeout_minutes', 5)
-    
-    @property
-    def purge_max(self) -> int:
-        return self.data.get('limits', {}).get('purge_max', 350)
-    
-    @property
-    def quote_scan_limit(self) -> int:
-        return self.data.get('limits', {}).get('quote_scan_limit', 2000)
-    
-    @property
-    def quote_min_length(self) -> int:
-        return self.data.get('limits', {}).get('quote_min_length', 20)
-    
-    @property
-    def database_path(self) -> str:
-        return self.data.get('database', {}).get('path', 'data/bot.db')
-    
-    @property
-    def log_channel_id(self) -> Optional[int]:
-        return self.data.get('logging', {}).get('log_channel_id')
-    
-    def set_log_channel(self, channel_id: Optional[int]):
-        if 'logging' not in self.data:
-            self.data['logging'] = {}
-        self.data['logging']['log_channel_id'] = channel_id
-        self.save()
+        self._mtime = self._stat_mtime()
+
+    def reload(self) -> ConfigSnapshot:
+        """Re-read and validate config.json, then swap in the new snapshot.
+
+        On any error the current snapshot stays in place and the error is
+        raised to the caller. Settings that are only read at startup
+        (token, database, gateway) still need a restart to take effect.
+        """
+        data = self._load_config()
+        snapshot = ConfigSnapshot.from_dict(data)
+        self.data, self.snapshot = data, snapshot
+        self._mtime = self._stat_mtime()
+        return snapshot
+
+    async def watch(self, interval: float, on_reload: Optional[Callable[[ConfigSnapshot], Any]] = None):
+        """Poll config.json every ``interval`` seconds and reload it when it changes"""
+        while True:
+            await asyncio.sleep(interval)
+
+            mtime = self._stat_mtime()
+            if mtime is None or mtime == self._mtime:
+                continue
+
+            try:
+                data = await asyncio.to_thread(self._load_config)
+                snapshot = ConfigSnapshot.from_dict(data)
+            except (OSError, ValueError) as e:
+                # Remember the broken version so it is not re-parsed every poll
+                self._mtime = mtime
+                logger.error(f"Ignoring config.json change: {e}")
+                continue
+
+            self.data, self.snapshot = data, snapshot
+            self._mtime = mtime
+            logger.info("Reloaded config.json")
+            if on_reload:
+                on_reload(snapshot)
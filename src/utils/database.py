@@ -1,154 +1,469 @@
+import json
+import logging
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, List, Tuple
 from datetime import datetime
 
-class Database:
-    def __init__(self, db_path: str = "data/bot.db"):
+from utils.migrations import run_migrations
+from utils.storage import ScheduledJob, StorageBackend
+
+logger = logging.getLogger("JanitorBot.database")
+
+class Database(StorageBackend):
+    SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+    def __init__(
+        self,
+        db_path: str = "data/bot.db",
+        synchronous: str = "NORMAL",
+        cached_statements: int = 128,
+        write_behind: bool = False,
+        flush_interval_ms: int = 250,
+        flush_max_ops: int = 100
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(exist_ok=True)
+
+        synchronous = synchronous.upper()
+        if synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        self.synchronous = synchronous
+        self.cached_statements = cached_statements
+
+        # Write-behind: duel stat increments are buffered here as
+        # (guild_id, user_id) -> [wins, losses, last_duel] and written in one
+        # transaction once flush_interval_ms has passed or flush_max_ops have
+        # queued up.
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_ops = flush_max_ops
+        self._pending: Dict[Tuple[int, int], list] = {}
+        # Totals on disk when each buffered player was first buffered; the
+        # rows cannot change until the next flush, so buffered standings
+        # are known without a query
+        self._pending_base: Dict[Tuple[int, int], Dict[str, int]] = {}
+        self._pending_ops = 0
+        self._last_flush = time.monotonic()
+
+        # One connection for the lifetime of the bot, shared between threads
+        # and serialized by this lock.
+        self._lock = threading.RLock()
+        self._conn = self._get_connection()
         self._init_tables()
-    
-    def _get_connection(self):
-        return sqlite3.connect(self.db_path)
-    
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        # Set first: other bot processes may hold the write lock (launcher.py)
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def _cursor(self):
+        """Yield a cursor on the shared connection, committing on success"""
+        with self._lock:
+            if self._conn is None:
+                raise sqlite3.ProgrammingError("Database is closed")
+
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+
+            try:
+                self.flush()
+                self._conn.execute("PRAGMA optimize")
+            finally:
+                self._conn.close()
+                self._conn = None
+
     def _init_tables(self):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS duel_stats (
-                user_id INTEGER PRIMARY KEY,
-                wins INTEGER DEFAULT 0,
-                losses INTEGER DEFAULT 0,
-                last_duel INTEGER DEFAULT 0
+        with self._lock:
+            run_migrations(self._conn)
+
+    def database_files(self) -> List[Path]:
+        return [self.db_path]
+
+    @property
+    def maintenance_interval(self) -> Optional[float]:
+        """How often run_maintenance needs to be called, or None if never"""
+        return self.flush_interval if self.write_behind else None
+
+    def run_maintenance(self):
+        self.maybe_flush()
+
+    @staticmethod
+    def _stats_from_row(row) -> Dict[str, int]:
+        if row:
+            return {
+                'wins': row[0],
+                'losses': row[1],
+                'last_duel': row[2]
+            }
+        return {'wins': 0, 'losses': 0, 'last_duel': 0}
+
+    def get_duel_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT wins, losses, last_duel FROM duel_stats WHERE guild_id=? AND user_id=?",
+                (guild_id, user_id)
             )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS custom_roles (
-                user_id INTEGER,
-                role_id INTEGER,
-                created_at INTEGER,
-                PRIMARY KEY (user_id, role_id)
+            result = cursor.fetchone()
+            return self._with_pending(guild_id, user_id, self._stats_from_row(result))
+
+    def get_many_duel_stats(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Get stats for several users in one query, keyed by user ID"""
+        user_ids = list(dict.fromkeys(user_ids))
+        stats = {user_id: self._stats_from_row(None) for user_id in user_ids}
+        if not user_ids:
+            return stats
+
+        placeholders = ", ".join("?" * len(user_ids))
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT user_id, wins, losses, last_duel FROM duel_stats "
+                f"WHERE guild_id=? AND user_id IN ({placeholders})",
+                [guild_id, *user_ids]
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def get_duel_stats(self, user_id: int) -> Dict[str, int]:
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT wins, losses, last_duel FROM duel_stats WHERE user_id=?",
-            (user_id,)
-        )
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
+            for row in cursor.fetchall():
+                stats[row[0]] = self._stats_from_row(row[1:])
             return {
-                'wins': result[0],
-                'losses': result[1],
-                'last_duel': result[2]
+                user_id: self._with_pending(guild_id, user_id, stats[user_id])
+                for user_id in stats
             }
-        return {'wins': 0, 'losses': 0, 'last_duel': 0}
-    
-    def update_duel_stats(self, user_id: int, won: bool = False):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
+
+    def _with_pending(self, guild_id: int, user_id: int, stats: Dict[str, int]) -> Dict[str, int]:
+        """Overlay buffered write-behind increments on stats read from disk"""
+        pending = self._pending.get((guild_id, user_id))
+        if pending is None:
+            return stats
+
+        return {
+            'wins': stats['wins'] + pending[0],
+            'losses': stats['losses'] + pending[1],
+            'last_duel': max(stats['last_duel'], pending[2])
+        }
+
+    def _apply_duel_deltas(self, cursor, deltas) -> Dict[Tuple[int, int], Dict[str, int]]:
+        """Add (guild_id, user_id, wins, losses, last_duel) deltas in a single UPSERT.
+
+        win_ratio is recomputed in the same statement so the leaderboard
+        index always reflects the new totals.
+        """
+        values = ", ".join("(?, ?, ?, ?, ?, ?)" for _ in deltas)
+        params = []
+        for guild_id, user_id, wins, losses, last_duel in deltas:
+            ratio = wins / (wins + losses) if wins + losses else None
+            params.extend((guild_id, user_id, wins, losses, last_duel, ratio))
+
         cursor.execute(
-            "INSERT OR IGNORE INTO duel_stats (user_id) VALUES (?)",
-            (user_id,)
+            f"""
+            INSERT INTO duel_stats (guild_id, user_id, wins, losses, last_duel, win_ratio) VALUES {values}
+            ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                wins = wins + excluded.wins,
+                losses = losses + excluded.losses,
+                last_duel = MAX(last_duel, excluded.last_duel),
+                win_ratio = CAST(wins + excluded.wins AS REAL)
+                    / NULLIF(wins + excluded.wins + losses + excluded.losses, 0)
+            RETURNING guild_id, user_id, wins, losses, last_duel
+            """,
+            params
         )
-        
+        return {(row[0], row[1]): self._stats_from_row(row[2:]) for row in cursor.fetchall()}
+
+    def _buffer_duel_delta(self, guild_id: int, user_id: int, wins: int, losses: int, timestamp: int):
+        with self._lock:
+            pending = self._pending.get((guild_id, user_id))
+            if pending is None:
+                with self._cursor() as cursor:
+                    cursor.execute(
+                        "SELECT wins, losses, last_duel FROM duel_stats WHERE guild_id=? AND user_id=?",
+                        (guild_id, user_id)
+                    )
+                    self._pending_base[(guild_id, user_id)] = self._stats_from_row(cursor.fetchone())
+                pending = self._pending[(guild_id, user_id)] = [0, 0, 0]
+            pending[0] += wins
+            pending[1] += losses
+            pending[2] = max(pending[2], timestamp)
+            self._pending_ops += 1
+
+            if self._pending_ops >= self.flush_max_ops:
+                self.flush()
+
+    def flush(self):
+        """Write all buffered duel stat increments in a single transaction"""
+        with self._lock:
+            if not self._pending:
+                self._last_flush = time.monotonic()
+                return
+
+            deltas = [
+                (guild_id, user_id, wins, losses, last_duel)
+                for (guild_id, user_id), (wins, losses, last_duel) in self._pending.items()
+            ]
+            # Keep the buffer until the transaction commits so a failed
+            # flush is retried instead of losing increments.
+            with self._cursor() as cursor:
+                for i in range(0, len(deltas), 500):
+                    self._apply_duel_deltas(cursor, deltas[i:i + 500])
+
+            self._pending.clear()
+            self._pending_base.clear()
+            self._pending_ops = 0
+            self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush buffered writes if the flush interval has elapsed"""
+        if not self._pending:
+            return
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to flush duel stats: {e}")
+
+    def update_duel_stats(self, guild_id: int, user_id: int, won: bool = False):
         timestamp = int(datetime.now().timestamp())
-        
-        if won:
-            cursor.execute(
-                "UPDATE duel_stats SET wins = wins + 1, last_duel = ? WHERE user_id=?",
-                (timestamp, user_id)
+
+        if self.write_behind:
+            return self._buffer_duel_delta(guild_id, user_id, int(won), int(not won), timestamp)
+
+        with self._cursor() as cursor:
+            self._apply_duel_deltas(cursor, [(guild_id, user_id, int(won), int(not won), timestamp)])
+
+    def record_duel_result(
+        self,
+        guild_id: int,
+        winner_id: int,
+        loser_id: int
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Record a finished duel in one statement and return both players' new stats"""
+        timestamp = int(datetime.now().timestamp())
+
+        if self.write_behind:
+            with self._lock:
+                self._buffer_duel_delta(guild_id, winner_id, 1, 0, timestamp)
+                self._buffer_duel_delta(guild_id, loser_id, 0, 1, timestamp)
+                # A flush between the two calls empties the buffer; the rows are current then
+                if (guild_id, winner_id) in self._pending and (guild_id, loser_id) in self._pending:
+                    return self._buffered_stats(guild_id, winner_id), self._buffered_stats(guild_id, loser_id)
+                stats = self.get_many_duel_stats(guild_id, [winner_id, loser_id])
+            return stats[winner_id], stats[loser_id]
+
+        with self._cursor() as cursor:
+            stats = self._apply_duel_deltas(cursor, [
+                (guild_id, winner_id, 1, 0, timestamp),
+                (guild_id, loser_id, 0, 1, timestamp)
+            ])
+
+        return stats[(guild_id, winner_id)], stats[(guild_id, loser_id)]
+
+    def _buffered_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        return self._with_pending(guild_id, user_id, self._pending_base[(guild_id, user_id)])
+
+    @staticmethod
+    def _standing(user_id: int, stats: Dict[str, int]) -> Optional[Tuple[float, int, int]]:
+        """Leaderboard sort key (lower ranks higher), or None without any duels"""
+        played = stats['wins'] + stats['losses']
+        if not played:
+            return None
+        return (-(stats['wins'] / played), -stats['wins'], user_id)
+
+    def _pending_standings(self, guild_id: int) -> List[Tuple[int, Optional[tuple], Optional[tuple]]]:
+        """(user_id, standing on disk, standing with buffered increments) per buffered player.
+
+        The leaderboard reads run their usual index queries, which see the
+        on-disk rows, and correct for these few players in memory, so reads
+        never have to flush the write-behind buffer.
+        """
+        return [
+            (
+                user_id,
+                self._standing(user_id, self._pending_base[(pending_guild, user_id)]),
+                self._standing(user_id, self._buffered_stats(pending_guild, user_id))
             )
-        else:
+            for pending_guild, user_id in self._pending
+            if pending_guild == guild_id
+        ]
+
+    def get_duel_leaderboard(self, guild_id: int, limit: int = 5, offset: int = 0):
+        """Get a page of top players by win ratio, walking the leaderboard index"""
+        with self._lock:
+            pending = self._pending_standings(guild_id)
+            with self._cursor() as cursor:
+                # Read far enough to still fill the page once buffered players' stale rows are dropped
+                cursor.execute('''
+                    SELECT user_id, wins, losses
+                    FROM duel_stats
+                    WHERE guild_id = ? AND win_ratio IS NOT NULL
+                    ORDER BY win_ratio DESC, wins DESC, user_id
+                    LIMIT ? OFFSET ?
+                ''', (guild_id, limit + (offset if pending else 0) + len(pending), 0 if pending else offset))
+                rows = cursor.fetchall()
+            if not pending:
+                return rows
+
+            buffered = {user_id for user_id, _, _ in pending}
+            rows = [row for row in rows if row[0] not in buffered]
+            for user_id, _, standing in pending:
+                if standing is not None:
+                    stats = self._buffered_stats(guild_id, user_id)
+                    rows.append((user_id, stats['wins'], stats['losses']))
+
+        rows.sort(key=lambda row: self._standing(row[0], {'wins': row[1], 'losses': row[2]}))
+        return rows[offset:offset + limit]
+
+    def count_ranked_duelists(self, guild_id: int) -> int:
+        """Number of players with at least one duel on the guild's leaderboard"""
+        with self._lock:
+            pending = self._pending_standings(guild_id)
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM duel_stats WHERE guild_id = ? AND win_ratio IS NOT NULL",
+                    (guild_id,)
+                )
+                # Buffered players whose first duel is not on disk yet
+                return cursor.fetchone()[0] + sum(1 for _, on_disk, _ in pending if on_disk is None)
+
+    def get_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        """Leaderboard position of a user (1-based), or None if they have no duels.
+
+        Counts only the players ahead of the user with range seeks on the
+        leaderboard index, using the same tie-breakers as the leaderboard.
+        Buffered write-behind increments are applied to that count in memory.
+        """
+        with self._lock:
+            pending = self._pending_standings(guild_id)
+            if (guild_id, user_id) in self._pending:
+                key = self._standing(user_id, self._buffered_stats(guild_id, user_id))
+                ratio, wins = -key[0], -key[1]
+            else:
+                with self._cursor() as cursor:
+                    cursor.execute(
+                        "SELECT win_ratio, wins FROM duel_stats "
+                        "WHERE guild_id=? AND user_id=? AND win_ratio IS NOT NULL",
+                        (guild_id, user_id)
+                    )
+                    row = cursor.fetchone()
+                if not row:
+                    return None
+                ratio, wins = row
+                key = (-ratio, -wins, user_id)
+
+            with self._cursor() as cursor:
+                cursor.execute('''
+                    SELECT
+                        (SELECT COUNT(*) FROM duel_stats
+                         WHERE guild_id = ? AND win_ratio > ?)
+                        + (SELECT COUNT(*) FROM duel_stats
+                           WHERE guild_id = ? AND win_ratio = ? AND wins > ?)
+                        + (SELECT COUNT(*) FROM duel_stats
+                           WHERE guild_id = ? AND win_ratio = ? AND wins = ? AND user_id < ?)
+                ''', (guild_id, ratio, guild_id, ratio, wins, guild_id, ratio, wins, user_id))
+                ahead = cursor.fetchone()[0]
+
+        # Swap each buffered player's on-disk standing for their current one
+        # (the user's own stale row may be counted too, but never their current one)
+        for other_id, on_disk, current in pending:
+            ahead -= on_disk is not None and on_disk < key
+            ahead += other_id != user_id and current is not None and current < key
+        return ahead + 1
+
+    def get_user_custom_roles(self, guild_id: int, user_id: int):
+        """Get all custom roles for a user in a guild"""
+        with self._cursor() as cursor:
             cursor.execute(
-                "UPDATE duel_stats SET losses = losses + 1, last_duel = ? WHERE user_id=?",
-                (timestamp, user_id)
+                "SELECT role_id, created_at FROM custom_roles WHERE guild_id=? AND user_id=?",
+                (guild_id, user_id)
             )
-        
-        conn.commit()
-        conn.close()
-    
-    def get_duel_leaderboard(self, limit: int = 5):
-        """Get top players by win ratio"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_id, wins, losses 
-            FROM duel_stats 
-            WHERE wins + losses > 0 
-            ORDER BY CAST(wins AS FLOAT) / NULLIF(wins + losses, 0) DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-                
-        return results
-
-    def get_user_custom_roles(self, user_id: int):
-        """Get all custom roles for a user"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT role_id, created_at FROM custom_roles WHERE user_id=?",
-            (user_id,)
-        )
-        results = cursor.fetchall()
-        conn.close()
-        
+            results = cursor.fetchall()
+
         return [(r[0], r[1]) for r in results]
-    
-    def add_custom_role(self, user_id: int, role_id: int):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
+
+    def add_custom_role(self, guild_id: int, user_id: int, role_id: int):
         timestamp = int(datetime.now().timestamp())
-        
-        cursor.execute(
-            "INSERT OR REPLACE INTO custom_roles (user_id, role_id, created_at) VALUES (?, ?, ?)",
-            (user_id, role_id, timestamp)
-        )
-        
-        conn.commit()
-        conn.close()
-    
-    def remove_custom_role(self, user_id: int, role_id: int):
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "DELETE FROM custom_roles WHERE user_id=? AND role_id=?",
-            (user_id, role_id)
-        )
-        
-        conn.commit()
-        conn.close()
-    
-    def count_user_custom_roles(self, user_id: int) -> int:
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT COUNT(*) FROM custom_roles WHERE user_id=?",
-            (user_id,)
-        )
-        result = cursor.fetchone()
-        conn.close()
-        
+
+        with self._cursor() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO custom_roles (guild_id, user_id, role_id, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (guild_id, user_id, role_id, timestamp)
+            )
+
+    def remove_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        with self._cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM custom_roles WHERE guild_id=? AND user_id=? AND role_id=?",
+                (guild_id, user_id, role_id)
+            )
+
+    def count_user_custom_roles(self, guild_id: int, user_id: int) -> int:
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM custom_roles WHERE guild_id=? AND user_id=?",
+                (guild_id, user_id)
+            )
+            result = cursor.fetchone()
+
         return result[0] if result else 0
+
+    def add_scheduled_job(self, guild_id: int, kind: str, key: str, due_at: float, payload: dict) -> int:
+        timestamp = int(datetime.now().timestamp())
+
+        # REPLACE deletes the old row, so a rescheduled job gets a new ID and
+        # the scheduler's stale heap entry finds nothing when it comes due
+        with self._cursor() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO scheduled_jobs (guild_id, kind, key, due_at, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, kind, key, due_at, json.dumps(payload), timestamp)
+            )
+            return cursor.lastrowid
+
+    def cancel_scheduled_job(self, guild_id: int, kind: str, key: str) -> bool:
+        with self._cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM scheduled_jobs WHERE guild_id=? AND kind=? AND key=?",
+                (guild_id, kind, key)
+            )
+            return cursor.rowcount > 0
+
+    def get_scheduled_job(self, job_id: int) -> Optional[ScheduledJob]:
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT id, guild_id, kind, key, due_at, payload FROM scheduled_jobs WHERE id=?",
+                (job_id,)
+            )
+            row = cursor.fetchone()
+
+        return ScheduledJob(*row[:5], json.loads(row[5])) if row else None
+
+    def delete_scheduled_job(self, job_id: int):
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM scheduled_jobs WHERE id=?", (job_id,))
+
+    def get_scheduled_job_times(self) -> List[Tuple[float, int, int]]:
+        with self._cursor() as cursor:
+            cursor.execute("SELECT due_at, id, guild_id FROM scheduled_jobs ORDER BY due_at")
+            return cursor.fetchall()
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single bot process, nothing to coordinate with
+    fcntl = None
+
+from utils.helpers import write_atomic
+
+logger = logging.getLogger("JanitorBot.settings")
+
+@dataclass(frozen=True)
+class GuildSettings:
+    """Effective settings for one guild: config.json defaults plus overrides"""
+
+    log_channel_id: Optional[int]
+    birthday_role_id: int
+    duel_cooldown: int
+    fork_cooldown_minutes: int
+    purge_max: int
+    protected_roles: Tuple[int, ...]
+
+    @classmethod
+    def defaults(cls, snapshot) -> 'GuildSettings':
+        return cls(
+            log_channel_id=snapshot.log_channel_id,
+            birthday_role_id=snapshot.birthday_role_id,
+            duel_cooldown=snapshot.duel_cooldown,
+            fork_cooldown_minutes=snapshot.fork_cooldown_minutes,
+            purge_max=snapshot.purge_max,
+            protected_roles=snapshot.protected_role_ids
+        )
+
+SETTING_NAMES = frozenset(f.name for f in fields(GuildSettings))
+
+class GuildSettingsStore:
+    """Per-guild overrides of config.json settings.
+
+    Overrides live in memory and are persisted to one JSON file. Reads
+    never touch the disk; ``update`` marks the store dirty and schedules a
+    single flush ``flush_delay_ms`` later, so a burst of changes costs one
+    write. Each write goes to a temp file that is renamed over the old one,
+    so a crash never leaves a half-written file behind.
+
+    When launcher.py runs several processes they share the file, so a
+    flush re-reads it under a lock and only replaces the guilds this
+    process changed.
+    """
+
+    def __init__(self, config, path: str = "data/guild_settings.json", flush_delay_ms: int = 500):
+        self.config = config
+        self.path = Path(path)
+        self.flush_delay = flush_delay_ms / 1000
+        self._overrides: Dict[int, dict] = self._load()
+        # guild_id -> (config snapshot the entry was built from, settings)
+        self._cache: Dict[int, Tuple[object, GuildSettings]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._dirty: Set[int] = set()
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load(self) -> Dict[int, dict]:
+        raw = self._read()
+
+        overrides = {}
+        for guild_id, values in raw.items():
+            unknown = set(values) - SETTING_NAMES
+            if unknown:
+                logger.warning(f"Ignoring unknown settings for guild {guild_id}: {', '.join(sorted(unknown))}")
+            overrides[int(guild_id)] = {k: v for k, v in values.items() if k in SETTING_NAMES}
+        return overrides
+
+    def get(self, guild_id: Optional[int]) -> GuildSettings:
+        """Settings for ``guild_id``; ``None`` (DMs) gets the config.json defaults"""
+        snapshot = self.config.snapshot
+        cached = self._cache.get(guild_id)
+        # Entries built from an older config snapshot pick up reloaded defaults
+        if cached and cached[0] is snapshot:
+            return cached[1]
+
+        settings = GuildSettings.defaults(snapshot)
+        overrides = self._overrides.get(guild_id)
+        if overrides:
+            if 'protected_roles' in overrides:
+                overrides = {**overrides, 'protected_roles': tuple(overrides['protected_roles'])}
+            settings = replace(settings, **overrides)
+
+        self._cache[guild_id] = (snapshot, settings)
+        return settings
+
+    def update(self, guild_id: int, **changes) -> GuildSettings:
+        unknown = set(changes) - SETTING_NAMES
+        if unknown:
+            raise ValueError(f"Unknown guild settings: {', '.join(sorted(unknown))}")
+
+        if 'protected_roles' in changes:
+            changes['protected_roles'] = sorted(set(changes['protected_roles']))
+
+        self._overrides.setdefault(guild_id, {}).update(changes)
+        self._cache.pop(guild_id, None)
+        self._schedule_flush(guild_id)
+        return self.get(guild_id)
+
+    def reset(self, guild_id: int, *names: str) -> GuildSettings:
+        """Drop overrides so the config.json defaults apply again (all of them if no names)"""
+        overrides = self._overrides.get(guild_id, {})
+        for name in names or list(overrides):
+            overrides.pop(name, None)
+        if not overrides:
+            self._overrides.pop(guild_id, None)
+
+        self._cache.pop(guild_id, None)
+        self._schedule_flush(guild_id)
+        return self.get(guild_id)
+
+    def overrides(self, guild_id: int) -> dict:
+        return dict(self._overrides.get(guild_id, {}))
+
+    def _schedule_flush(self, guild_id: int):
+        self._dirty.add(guild_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Loop so updates made while a write was in flight are not left behind
+        while self._dirty:
+            await asyncio.sleep(self.flush_delay)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Failed to save guild settings: {e}")
+                return
+
+    def _merge_write(self, changes: Dict[int, dict]):
+        """Apply ``changes`` to the file on disk; empty overrides remove the guild"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                raw = self._read()
+            except ValueError as e:
+                logger.error(f"{self.path} was unreadable, rewriting it from memory: {e}")
+                raw = {str(guild_id): values for guild_id, values in self._overrides.items()}
+
+            for guild_id, values in changes.items():
+                if values:
+                    raw[str(guild_id)] = values
+                else:
+                    raw.pop(str(guild_id), None)
+            write_atomic(self.path, json.dumps(raw, indent=2))
+
+    async def flush(self):
+        async with self._write_lock:
+            if not self._dirty:
+                return
+            # Copy on the loop so the worker thread never sees a dict mid-update
+            changes = {guild_id: dict(self._overrides.get(guild_id, {})) for guild_id in self._dirty}
+            self._dirty = set()
+            try:
+                await asyncio.to_thread(self._merge_write, changes)
+            except OSError:
+                self._dirty.update(changes)
+                raise
+
+    async def close(self):
+        # Flush first: a pending task may be mid-write and holds the lock until done
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
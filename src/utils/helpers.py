@@ -1,22 +1,38 @@
 import discord
+import os
+from pathlib import Path
 from typing import Optional
 import re
 from datetime import timedelta
 
+async def ensure_chunked(guild: discord.Guild) -> bool:
+    """Fill ``guild.members`` before code that scans it.
+
+    Guilds are not chunked at startup, so the member cache may be partial.
+    This requests the full list on first use (discord.py shares one request
+    between concurrent callers). Returns False if the members intent is
+    off, in which case ``guild.members`` stays partial.
+    """
+    if guild.chunked:
+        return True
+    try:
+        await guild.chunk(cache=True)
+    except discord.ClientException:
+        return False
+    return True
+
 async def get_user(ctx, user_input: str) -> Optional[discord.Member]:
+    client = getattr(ctx, 'bot', None) or ctx.client
     try:
         if user_input.startswith('<@') and user_input.endswith('>'):
             user_id = int(user_input[2:-1].replace('!', ''))
-            return await ctx.guild.fetch_member(user_id)
+            return await client.resolver.get_member(ctx.guild, user_id)
         
         if user_input.isdigit():
-            return await ctx.guild.fetch_member(int(user_input))
+            return await client.resolver.get_member(ctx.guild, int(user_input))
         
-        return discord.utils.find(
-            lambda m: user_input.lower() in m.name.lower() or 
-                     (m.nick and user_input.lower() in m.nick.lower()),
-            ctx.guild.members
-        )
+        matches = await client.member_index.search(ctx.guild, user_input, limit=1)
+        return matches[0] if matches else None
     except:
         return None
 
@@ -55,5 +71,16 @@ def format_duration(seconds: int) -> str:
         days = seconds // 86400
         return f"{days} day{'s' if days != 1 else ''}"
 
+def write_atomic(path: Path, payload: str):
+    """Write ``payload`` to a temp file next to ``path`` and rename it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
 async def is_admin(interaction: discord.Interaction) -> bool:
     return interaction.user.guild_permissions.administrator
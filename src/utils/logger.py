@@ -1,17 +1,144 @@
+import contextvars
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
+
+# Set per interaction (see JanitorTree in main.py) and copied onto every
+# record logged while that command runs
+log_context: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('log_context', default=None)
+
+CONTEXT_FIELDS = ('guild_id', 'command', 'latency_ms')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_queue_logger: Optional[logging.Logger] = None
+
+def bind_log_context(guild_id: Optional[int] = None, command: Optional[str] = None):
+    """Tag log records from the current task with a guild and command.
+
+    ``latency_ms`` on those records is the time since this call.
+    """
+    log_context.set({'guild_id': guild_id, 'command': command, 'started': time.perf_counter()})
+
+class ContextFilter(logging.Filter):
+    """Copies log_context onto the record.
+
+    Attached to the QueueHandler so it runs in the task that logged; the
+    listener thread cannot see that task's context variables.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = log_context.get()
+        if context:
+            record.guild_id = context['guild_id']
+            record.command = context['command']
+            record.latency_ms = round((time.perf_counter() - context['started']) * 1000, 2)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with guild/command/latency when known"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        # QueueHandler.prepare() has already folded any traceback into the message
+        return json.dumps(entry, ensure_ascii=False)
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file passes ``max_bytes`` or at the next ``when`` boundary.
+
+    ``when`` is 'midnight', 'hourly' or None. Rotated files are numbered
+    like RotatingFileHandler's (bot.log.1 is the newest) and gzipped when
+    ``compress`` is set. Rotation runs in the QueueListener thread.
+    """
+
+    def __init__(self, filename, max_bytes: int = 0, backup_count: int = 0, when: Optional[str] = None,
+                 compress: bool = True, encoding: str = 'utf-8'):
+        # Checked first: the base class opens the file, which would leak on a bad argument
+        if when not in (None, 'midnight', 'hourly'):
+            raise ValueError(f"Unsupported rotation interval: {when}")
+        if backup_count < 1 and (when or max_bytes):
+            raise ValueError("Rotation needs backup_count of at least 1")
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.when = when
+        self.rollover_at = self._next_rollover()
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self._compress
+
+    def _next_rollover(self) -> Optional[float]:
+        now = datetime.now()
+        if self.when == 'midnight':
+            return datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).timestamp()
+        if self.when == 'hourly':
+            return (now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).timestamp()
+        return None
+
+    @staticmethod
+    def _compress(source: str, destination: str):
+        with open(source, 'rb') as f_in, gzip.open(destination, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+def setup_logger(
+    name: str = "JanitorBot",
+    level: int = logging.INFO,
+    log_dir: str = "logs",
+    file_stem: str = "bot",
+    json_format: bool = False,
+    max_bytes: int = 10_000_000,
+    backup_count: int = 14,
+    when: Optional[str] = 'midnight',
+    compress: bool = True
+):
+    """Configure ``name`` to log through a queue to a background thread.
+
+    The calling code only puts records on a queue; formatting, file
+    writes and rotation happen in a QueueListener thread. Calling this
+    again replaces the previous setup instead of adding handlers. Each
+    process needs its own ``file_stem``; rotation is not safe when two
+    processes share one file.
+    """
+    global _listener, _queue_handler, _queue_logger
 
-def setup_logger(name: str = "JanitorBot", level: int = logging.INFO):
     logger = logging.getLogger(name)
     logger.setLevel(level)
+    stop_logging()
+
+    log_path = Path(log_dir)
+    log_path.mkdir(parents=True, exist_ok=True)
 
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    file_handler = logging.FileHandler(
-        log_dir / "bot.log",
-        encoding='utf-8',
-        mode='a'
+    file_handler = CompressingRotatingFileHandler(
+        log_path / f"{file_stem}.{'jsonl' if json_format else 'log'}",
+        max_bytes=max_bytes,
+        backup_count=backup_count,
+        when=when,
+        compress=compress
     )
     file_handler.setLevel(logging.DEBUG)
     console_handler = logging.StreamHandler()
@@ -20,11 +147,35 @@ def setup_logger(name: str = "JanitorBot", level: int = logging.INFO):
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
-    file_handler.setFormatter(formatter)
+
+    file_handler.setFormatter(JsonFormatter() if json_format else formatter)
     console_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(ContextFilter())
+    logger.addHandler(_queue_handler)
+    _queue_logger = logger
+
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue,
+        file_handler,
+        console_handler,
+        respect_handler_level=True
+    )
+    _listener.start()
+
     return logger
+
+def stop_logging():
+    """Drain the log queue, close the files and detach the queue handler"""
+    global _listener, _queue_handler, _queue_logger
+
+    if _queue_handler is not None:
+        _queue_logger.removeHandler(_queue_handler)
+        _queue_handler = _queue_logger = None
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from utils.helpers import ensure_chunked
+
+logger = logging.getLogger("JanitorBot.members")
+
+# Match quality, best first
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+# Prefix matches looked at before ranking; bounds one-letter queries in huge guilds
+PREFIX_SCAN_LIMIT = 2000
+# Names checked for substring matches; about 20k members' worth, after
+# which a search stops looking rather than walking the whole guild
+SUBSTRING_SCAN_LIMIT = 50000
+
+def name_keys(member: discord.Member) -> Tuple[str, ...]:
+    """Casefolded username, global display name and nickname, without duplicates"""
+    names = (member.name, member.global_name, member.nick)
+    return tuple(dict.fromkeys(name.casefold() for name in names if name))
+
+class GuildNameIndex:
+    """Sorted array of (name, member ID) for one guild.
+
+    Every username, global name and nickname is stored casefolded once, so
+    a lookup is a binary search for the prefix instead of lowercasing every
+    member's names. Members are added, moved and removed as gateway events
+    arrive.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._ids: List[int] = []
+        self._names: Dict[int, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def build(cls, members) -> 'GuildNameIndex':
+        index = cls()
+        pairs = []
+        for member in members:
+            keys = name_keys(member)
+            index._names[member.id] = keys
+            pairs.extend((key, member.id) for key in keys)
+
+        pairs.sort()
+        index._keys = [key for key, _ in pairs]
+        index._ids = [member_id for _, member_id in pairs]
+        return index
+
+    def _insert(self, key: str, member_id: int):
+        i = bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._ids.insert(i, member_id)
+
+    def _delete(self, key: str, member_id: int):
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._ids[i] == member_id:
+                del self._keys[i]
+                del self._ids[i]
+                return
+            i += 1
+
+    def add(self, member: discord.Member):
+        """Index ``member``, or re-index it if its names changed"""
+        keys = name_keys(member)
+        old = self._names.get(member.id, ())
+        if keys == old:
+            return
+
+        for key in old:
+            if key not in keys:
+                self._delete(key, member.id)
+        for key in keys:
+            if key not in old:
+                self._insert(key, member.id)
+        self._names[member.id] = keys
+
+    def remove(self, member_id: int):
+        for key in self._names.pop(member_id, ()):
+            self._delete(key, member_id)
+
+    def search(self, query: str, limit: int = 25, substring: bool = True) -> List[int]:
+        """Member IDs matching ``query``, best match first.
+
+        Exact names rank above prefixes, which rank above substrings (only
+        searched if ``substring`` is set and prefixes did not fill
+        ``limit``, and only among the first ``SUBSTRING_SCAN_LIMIT`` names).
+        Within a tier, shorter names come first.
+        """
+        query = query.strip().casefold()
+        if not query:
+            return []
+
+        # member_id -> (quality, name length)
+        best: Dict[int, Tuple[int, int]] = {}
+
+        def offer(member_id: int, quality: int, key: str):
+            rank = (quality, len(key))
+            if member_id not in best or rank < best[member_id]:
+                best[member_id] = rank
+
+        i = bisect_left(self._keys, query)
+        end = min(len(self._keys), i + PREFIX_SCAN_LIMIT)
+        while i < end and self._keys[i].startswith(query):
+            key = self._keys[i]
+            offer(self._ids[i], EXACT if key == query else PREFIX, key)
+            i += 1
+
+        if substring and len(best) < limit:
+            for key, member_id in islice(zip(self._keys, self._ids), SUBSTRING_SCAN_LIMIT):
+                if query in key and not key.startswith(query):
+                    offer(member_id, SUBSTRING, key)
+
+        ranked = sorted(best, key=lambda member_id: (best[member_id], member_id))
+        return ranked[:limit]
+
+class MemberIndex:
+    """Name indexes for every guild, built the first time a guild is searched"""
+
+    def __init__(self):
+        self._guilds: Dict[int, GuildNameIndex] = {}
+        self._building: Dict[int, asyncio.Task] = {}
+
+    def get(self, guild_id: int) -> Optional[GuildNameIndex]:
+        return self._guilds.get(guild_id)
+
+    async def for_guild(self, guild: discord.Guild) -> GuildNameIndex:
+        """The guild's index, chunking the guild and building it on first use"""
+        index = self._guilds.get(guild.id)
+        if index is not None:
+            return index
+
+        return await asyncio.shield(self._start_build(guild))
+
+    def _start_build(self, guild: discord.Guild) -> asyncio.Task:
+        task = self._building.get(guild.id)
+        if task is None:
+            task = self._building[guild.id] = asyncio.create_task(self._build(guild))
+            task.add_done_callback(lambda _: self._building.pop(guild.id, None))
+        return task
+
+    async def _build(self, guild: discord.Guild) -> GuildNameIndex:
+        await ensure_chunked(guild)
+        # No await between reading guild.members and storing the index, so
+        # no member event can slip in between
+        index = self._guilds[guild.id] = GuildNameIndex.build(guild.members)
+        logger.debug(f"Indexed {len(index)} members of guild {guild.id}")
+        return index
+
+    async def search(self, guild: discord.Guild, query: str, limit: int = 25) -> List[discord.Member]:
+        index = await self.for_guild(guild)
+        members = (guild.get_member(member_id) for member_id in index.search(query, limit))
+        return [member for member in members if member is not None]
+
+    def autocomplete(self, guild: discord.Guild, query: str, limit: int = 25) -> List[discord.Member]:
+        """Prefix matches for autocomplete, answered without waiting.
+
+        An unindexed guild starts building in the background and gets no
+        suggestions until it is ready, since autocomplete has to answer
+        within Discord's 3 second limit.
+        """
+        index = self._guilds.get(guild.id)
+        if index is None:
+            self._start_build(guild)
+            return []
+
+        members = (guild.get_member(member_id) for member_id in index.search(query, limit, substring=False))
+        return [member for member in members if member is not None]
+
+    def member_updated(self, member: discord.Member):
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    def member_removed(self, guild_id: int, member_id: int):
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(member_id)
+
+    def user_updated(self, user: discord.User):
+        """A username or global name changes in every guild at once"""
+        for guild in user.mutual_guilds:
+            member = guild.get_member(user.id)
+            if member is not None:
+                self.member_updated(member)
+
+    def drop(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
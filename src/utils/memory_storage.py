@@ -0,0 +1,159 @@
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.storage import ScheduledJob, StorageBackend
+
+class DuelRecord:
+    __slots__ = ('wins', 'losses', 'last_duel')
+
+    def __init__(self):
+        self.wins = 0
+        self.losses = 0
+        self.last_duel = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'wins': self.wins, 'losses': self.losses, 'last_duel': self.last_duel}
+
+    def sort_key(self, user_id: int):
+        # Same ordering as the SQLite leaderboard: ratio, then wins, then user ID
+        return (-self.wins / (self.wins + self.losses), -self.wins, user_id)
+
+class CustomRoleRecord:
+    __slots__ = ('role_id', 'created_at')
+
+    def __init__(self, role_id: int, created_at: int):
+        self.role_id = role_id
+        self.created_at = created_at
+
+class MemoryStorage(StorageBackend):
+    """Dict-backed storage with no persistence.
+
+    Meant for tests and benchmarks: the cogs' data paths run at memory
+    speed, and results can be compared against the SQLite backends.
+    """
+
+    def __init__(self):
+        # guild_id -> user_id -> record
+        self._duels: Dict[int, Dict[int, DuelRecord]] = {}
+        self._roles: Dict[int, Dict[int, Dict[int, CustomRoleRecord]]] = {}
+        self._jobs: Dict[int, ScheduledJob] = {}
+        # (guild_id, kind, key) -> job ID
+        self._job_keys: Dict[Tuple[int, str, str], int] = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def _empty_stats(self) -> Dict[str, int]:
+        return {'wins': 0, 'losses': 0, 'last_duel': 0}
+
+    def _ranked(self, guild_id: int) -> List[Tuple[int, DuelRecord]]:
+        records = self._duels.get(guild_id, {})
+        ranked = [(user_id, r) for user_id, r in records.items() if r.wins + r.losses]
+        ranked.sort(key=lambda item: item[1].sort_key(item[0]))
+        return ranked
+
+    def get_duel_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        with self._lock:
+            record = self._duels.get(guild_id, {}).get(user_id)
+            return record.as_dict() if record else self._empty_stats()
+
+    def get_many_duel_stats(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        with self._lock:
+            return {user_id: self.get_duel_stats(guild_id, user_id) for user_id in dict.fromkeys(user_ids)}
+
+    def _apply(self, guild_id: int, user_id: int, won: bool, timestamp: int) -> Dict[str, int]:
+        record = self._duels.setdefault(guild_id, {}).get(user_id)
+        if record is None:
+            record = self._duels[guild_id][user_id] = DuelRecord()
+
+        if won:
+            record.wins += 1
+        else:
+            record.losses += 1
+        record.last_duel = max(record.last_duel, timestamp)
+        return record.as_dict()
+
+    def update_duel_stats(self, guild_id: int, user_id: int, won: bool = False):
+        timestamp = int(datetime.now().timestamp())
+        with self._lock:
+            self._apply(guild_id, user_id, won, timestamp)
+
+    def record_duel_result(
+        self,
+        guild_id: int,
+        winner_id: int,
+        loser_id: int
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        timestamp = int(datetime.now().timestamp())
+        with self._lock:
+            self._apply(guild_id, winner_id, True, timestamp)
+            self._apply(guild_id, loser_id, False, timestamp)
+            return self.get_duel_stats(guild_id, winner_id), self.get_duel_stats(guild_id, loser_id)
+
+    def get_duel_leaderboard(self, guild_id: int, limit: int = 5, offset: int = 0) -> List[Tuple[int, int, int]]:
+        with self._lock:
+            page = self._ranked(guild_id)[offset:offset + limit]
+            return [(user_id, r.wins, r.losses) for user_id, r in page]
+
+    def count_ranked_duelists(self, guild_id: int) -> int:
+        with self._lock:
+            return sum(1 for r in self._duels.get(guild_id, {}).values() if r.wins + r.losses)
+
+    def get_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        with self._lock:
+            record = self._duels.get(guild_id, {}).get(user_id)
+            if record is None or not record.wins + record.losses:
+                return None
+
+            key = record.sort_key(user_id)
+            return 1 + sum(
+                1 for other_id, other in self._duels[guild_id].items()
+                if other.wins + other.losses and other.sort_key(other_id) < key
+            )
+
+    def get_user_custom_roles(self, guild_id: int, user_id: int) -> List[Tuple[int, int]]:
+        with self._lock:
+            roles = self._roles.get(guild_id, {}).get(user_id, {})
+            return [(r.role_id, r.created_at) for r in roles.values()]
+
+    def add_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        timestamp = int(datetime.now().timestamp())
+        with self._lock:
+            roles = self._roles.setdefault(guild_id, {}).setdefault(user_id, {})
+            roles[role_id] = CustomRoleRecord(role_id, timestamp)
+
+    def remove_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        with self._lock:
+            self._roles.get(guild_id, {}).get(user_id, {}).pop(role_id, None)
+
+    def count_user_custom_roles(self, guild_id: int, user_id: int) -> int:
+        with self._lock:
+            return len(self._roles.get(guild_id, {}).get(user_id, {}))
+
+    def add_scheduled_job(self, guild_id: int, kind: str, key: str, due_at: float, payload: dict) -> int:
+        with self._lock:
+            self.cancel_scheduled_job(guild_id, kind, key)
+            job = ScheduledJob(next(self._job_ids), guild_id, kind, key, due_at, dict(payload))
+            self._jobs[job.id] = job
+            self._job_keys[(guild_id, kind, key)] = job.id
+            return job.id
+
+    def cancel_scheduled_job(self, guild_id: int, kind: str, key: str) -> bool:
+        with self._lock:
+            job_id = self._job_keys.pop((guild_id, kind, key), None)
+            return job_id is not None and self._jobs.pop(job_id, None) is not None
+
+    def get_scheduled_job(self, job_id: int) -> Optional[ScheduledJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def delete_scheduled_job(self, job_id: int):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job:
+                self._job_keys.pop((job.guild_id, job.kind, job.key), None)
+
+    def get_scheduled_job_times(self) -> List[Tuple[float, int, int]]:
+        with self._lock:
+            return sorted((job.due_at, job.id, job.guild_id) for job in self._jobs.values())
@@ -0,0 +1,224 @@
+import contextvars
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+logger = logging.getLogger("JanitorBot.metrics")
+
+# Upper bounds in seconds; anything slower lands in the implicit +Inf bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+INTERACTION_CALLBACK = '/interactions/{webhook_id}/{webhook_token}/callback'
+
+class Histogram:
+    """Fixed-bucket streaming histogram; constant memory per command"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def prometheus(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class CommandStats:
+    __slots__ = ('duration', 'first_response', 'errors', 'rest_calls')
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.first_response = Histogram()
+        self.errors = 0
+        self.rest_calls = 0
+
+class Invocation:
+    """One running command; lives in a context variable for its task"""
+
+    __slots__ = ('started', 'first_response', 'rest_calls')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_response: Optional[float] = None
+        self.rest_calls = 0
+
+class CommandMetrics:
+    """Per-command latency, error and REST-call metrics.
+
+    JanitorTree calls ``begin``/``finish`` around every slash command.
+    REST requests are counted by wrapping the bot's HTTP client and the
+    webhook adapter used for interaction responses; both look up the
+    running command through a context variable, so concurrent commands
+    never see each other's counts.
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, CommandStats] = {}
+        self.rest_requests = 0
+        self._current: contextvars.ContextVar[Optional[Invocation]] = contextvars.ContextVar(
+            'command_invocation', default=None
+        )
+        self.webhook_adapter = InstrumentedWebhookAdapter(self)
+
+    def begin(self) -> Invocation:
+        invocation = Invocation()
+        self._current.set(invocation)
+        return invocation
+
+    def finish(self, command: str, invocation: Invocation, failed: bool):
+        self._current.set(None)
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+
+        stats.duration.observe(time.perf_counter() - invocation.started)
+        if invocation.first_response is not None:
+            stats.first_response.observe(invocation.first_response)
+        stats.rest_calls += invocation.rest_calls
+        if failed:
+            stats.errors += 1
+
+    def record_request(self, path: str):
+        self.rest_requests += 1
+        invocation = self._current.get()
+        if invocation is None:
+            return
+
+        invocation.rest_calls += 1
+        if invocation.first_response is None and path == INTERACTION_CALLBACK:
+            invocation.first_response = time.perf_counter() - invocation.started
+
+    def instrument_http(self, http):
+        """Count every request made through the bot's HTTPClient"""
+        original = http.request
+
+        async def request(route, **kwargs):
+            self.record_request(route.path)
+            return await original(route, **kwargs)
+
+        http.request = request
+
+    def summary(self, limit: int = 10) -> List[Tuple[str, CommandStats]]:
+        """Busiest commands first"""
+        ranked = sorted(self.commands.items(), key=lambda item: item[1].duration.count, reverse=True)
+        return ranked[:limit]
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP janitor_command_duration_seconds Time spent in the slash command handler",
+            "# TYPE janitor_command_duration_seconds histogram",
+        ]
+        for name, stats in sorted(self.commands.items()):
+            lines.extend(stats.duration.prometheus("janitor_command_duration_seconds", f'command="{name}"'))
+
+        lines += [
+            "# HELP janitor_command_first_response_seconds Time until the first response or defer",
+            "# TYPE janitor_command_first_response_seconds histogram",
+        ]
+        for name, stats in sorted(self.commands.items()):
+            lines.extend(stats.first_response.prometheus("janitor_command_first_response_seconds", f'command="{name}"'))
+
+        lines += [
+            "# HELP janitor_command_errors_total Slash command invocations that failed",
+            "# TYPE janitor_command_errors_total counter",
+        ]
+        lines.extend(f'janitor_command_errors_total{{command="{name}"}} {stats.errors}'
+                     for name, stats in sorted(self.commands.items()))
+
+        lines += [
+            "# HELP janitor_command_rest_requests_total Discord REST requests made by slash commands",
+            "# TYPE janitor_command_rest_requests_total counter",
+        ]
+        lines.extend(f'janitor_command_rest_requests_total{{command="{name}"}} {stats.rest_calls}'
+                     for name, stats in sorted(self.commands.items()))
+
+        lines += [
+            "# HELP janitor_rest_requests_total Discord REST requests made by the bot",
+            "# TYPE janitor_rest_requests_total counter",
+            f"janitor_rest_requests_total {self.rest_requests}",
+        ]
+        return "\n".join(lines) + "\n"
+
+class InstrumentedWebhookAdapter(AsyncWebhookAdapter):
+    """Webhook adapter that reports interaction responses and followups.
+
+    Interaction responses bypass the bot's HTTPClient, so the bot installs
+    this adapter through discord.py's ``async_context`` variable in
+    ``setup_hook``, before any gateway task exists to copy the default.
+    """
+
+    def __init__(self, metrics: CommandMetrics):
+        super().__init__()
+        self.metrics = metrics
+
+    async def request(self, route, *args, **kwargs):
+        self.metrics.record_request(route.path)
+        return await super().request(route, *args, **kwargs)
+
+class MetricsServer:
+    """Serves Prometheus text on ``http://host:port/metrics``.
+
+    ``sources`` are objects with a ``render_prometheus()`` method, such as
+    CommandMetrics and RestScheduler.
+    """
+
+    def __init__(self, sources, host: str = "127.0.0.1", port: int = 9102):
+        self.sources = list(sources)
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _handle(self, request):
+        from aiohttp import web
+        text = "".join(source.render_prometheus() for source in self.sources)
+        return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,186 @@
+import logging
+import sqlite3
+import time
+from typing import Callable, List, NamedTuple, Tuple
+
+logger = logging.getLogger("JanitorBot.database")
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+
+def _initial_schema(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS duel_stats (
+            user_id INTEGER PRIMARY KEY,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            last_duel INTEGER DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS custom_roles (
+            user_id INTEGER,
+            role_id INTEGER,
+            created_at INTEGER,
+            PRIMARY KEY (user_id, role_id)
+        )
+    ''')
+
+def _add_win_ratio(cursor: sqlite3.Cursor):
+    # Databases opened by builds that predate migrations may already have it
+    if 'win_ratio' in _columns(cursor, 'duel_stats'):
+        return
+
+    cursor.execute("ALTER TABLE duel_stats ADD COLUMN win_ratio REAL")
+    cursor.execute('''
+        UPDATE duel_stats
+        SET win_ratio = CAST(wins AS REAL) / (wins + losses)
+        WHERE wins + losses > 0
+    ''')
+
+def _add_duel_indexes(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_duel_stats_leaderboard
+        ON duel_stats (win_ratio DESC, wins DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_duel_stats_last_duel
+        ON duel_stats (last_duel)
+    ''')
+
+def _add_guild_id(cursor: sqlite3.Cursor):
+    for table in ('duel_stats', 'custom_roles'):
+        if 'guild_id' not in _columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_custom_roles_guild_user
+        ON custom_roles (guild_id, user_id)
+    ''')
+
+def _partition_by_guild(cursor: sqlite3.Cursor):
+    # SQLite cannot change a primary key in place, so both tables are
+    # rebuilt with guild_id leading the key. Rows recorded before guild
+    # tracking keep guild_id 0.
+    cursor.execute('''
+        CREATE TABLE duel_stats_new (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER NOT NULL,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            last_duel INTEGER DEFAULT 0,
+            win_ratio REAL,
+            PRIMARY KEY (guild_id, user_id)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO duel_stats_new (guild_id, user_id, wins, losses, last_duel, win_ratio)
+        SELECT guild_id, user_id, wins, losses, last_duel, win_ratio FROM duel_stats
+    ''')
+    cursor.execute("DROP TABLE duel_stats")
+    cursor.execute("ALTER TABLE duel_stats_new RENAME TO duel_stats")
+    cursor.execute('''
+        CREATE INDEX idx_duel_stats_leaderboard
+        ON duel_stats (guild_id, win_ratio DESC, wins DESC, user_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_duel_stats_last_duel
+        ON duel_stats (last_duel)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE custom_roles_new (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER NOT NULL,
+            role_id INTEGER NOT NULL,
+            created_at INTEGER,
+            PRIMARY KEY (guild_id, user_id, role_id)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO custom_roles_new (guild_id, user_id, role_id, created_at)
+        SELECT guild_id, user_id, role_id, created_at FROM custom_roles
+    ''')
+    cursor.execute("DROP TABLE custom_roles")
+    cursor.execute("ALTER TABLE custom_roles_new RENAME TO custom_roles")
+
+def _add_scheduled_jobs(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE scheduled_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            created_at INTEGER
+        )
+    ''')
+    # One pending job per (guild, kind, key): rescheduling replaces it
+    cursor.execute('''
+        CREATE UNIQUE INDEX idx_scheduled_jobs_key
+        ON scheduled_jobs (guild_id, kind, key)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_scheduled_jobs_due
+        ON scheduled_jobs (due_at)
+    ''')
+
+# Append new migrations to the end with the next version number. Never edit
+# or reorder a migration that has shipped; deployed databases have already
+# recorded it in PRAGMA user_version.
+MIGRATIONS = [
+    Migration(1, "Create duel_stats and custom_roles", _initial_schema),
+    Migration(2, "Add duel_stats.win_ratio", _add_win_ratio),
+    Migration(3, "Index leaderboard ordering and duel_stats.last_duel", _add_duel_indexes),
+    Migration(4, "Add guild_id to duel_stats and custom_roles", _add_guild_id),
+    Migration(5, "Key duel_stats and custom_roles by guild", _partition_by_guild),
+    Migration(6, "Create scheduled_jobs", _add_scheduled_jobs),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS) -> List[Tuple[int, str, float]]:
+    """Apply every migration newer than PRAGMA user_version.
+
+    All pending migrations run in one transaction, so a failure leaves the
+    database at its previous version. Returns (version, description,
+    milliseconds) for each migration that was applied.
+    """
+    current = get_schema_version(conn)
+    pending = [m for m in migrations if m.version > current]
+    if not pending:
+        return []
+
+    applied = []
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Another process may have migrated while we waited for the write lock
+        current = get_schema_version(conn)
+        pending = [m for m in pending if m.version > current]
+        for migration in pending:
+            started = time.perf_counter()
+            migration.apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+            elapsed = (time.perf_counter() - started) * 1000
+            applied.append((migration.version, migration.description, elapsed))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.error(f"Schema migration failed, database left at version {current}")
+        raise
+    finally:
+        cursor.close()
+
+    for version, description, elapsed in applied:
+        logger.info(f"Applied migration {version} ({description}) in {elapsed:.1f}ms")
+
+    return applied
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.database import Database
+from utils.storage import ScheduledJob, StorageBackend
+
+class GuildPartitionedDatabase(StorageBackend):
+    """Stores each guild's data in its own SQLite file.
+
+    Exposes the same API as Database. Partitions are opened on first use,
+    kept in an LRU of at most ``max_open`` connections, and closed (after
+    flushing) when evicted or idle for ``idle_seconds``. Busy guilds no
+    longer share a write lock with every other guild.
+
+    Scheduled jobs are not per guild: the scheduler loads all of them at
+    startup, so they live in one ``global.db`` in the same directory.
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/guilds",
+        max_open: int = 64,
+        idle_seconds: float = 300,
+        **database_options
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_open = max(1, max_open)
+        self.idle_seconds = idle_seconds
+        self.database_options = database_options
+
+        self.write_behind = database_options.get('write_behind', False)
+        self.flush_interval = database_options.get('flush_interval_ms', 250) / 1000
+
+        # guild_id -> (Database, last used monotonic time), oldest first
+        self._open: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self._global: Optional[Database] = None
+
+    def path_for(self, guild_id: int) -> Path:
+        return self.directory / f"{guild_id}.db"
+
+    def _global_db(self) -> Database:
+        with self._lock:
+            if self._global is None:
+                self._global = Database(self.directory / "global.db", **self.database_options)
+            return self._global
+
+    def _partition(self, guild_id: int) -> Database:
+        with self._lock:
+            entry = self._open.pop(guild_id, None)
+            db = entry[0] if entry else Database(self.path_for(guild_id), **self.database_options)
+            self._open[guild_id] = (db, time.monotonic())
+
+            while len(self._open) > self.max_open:
+                _, (evicted, _) = self._open.popitem(last=False)
+                evicted.close()
+
+            return db
+
+    def database_files(self) -> List[Path]:
+        return sorted(self.directory.glob("*.db"))
+
+    def open_partitions(self) -> Dict[int, Database]:
+        with self._lock:
+            return {guild_id: db for guild_id, (db, _) in self._open.items()}
+
+    @property
+    def maintenance_interval(self) -> Optional[float]:
+        interval = self.idle_seconds / 2 if self.idle_seconds else None
+        if self.write_behind:
+            interval = min(interval, self.flush_interval) if interval else self.flush_interval
+        return interval
+
+    def run_maintenance(self):
+        """Flush due write-behind buffers and close partitions that went idle"""
+        with self._lock:
+            now = time.monotonic()
+            for guild_id, (db, last_used) in list(self._open.items()):
+                if self.idle_seconds and now - last_used >= self.idle_seconds:
+                    del self._open[guild_id]
+                    db.close()
+                else:
+                    db.maybe_flush()
+
+    def flush(self):
+        with self._lock:
+            for db, _ in self._open.values():
+                db.flush()
+
+    def close(self):
+        with self._lock:
+            while self._open:
+                _, (db, _) = self._open.popitem(last=False)
+                db.close()
+            if self._global:
+                self._global.close()
+                self._global = None
+
+    def get_duel_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        return self._partition(guild_id).get_duel_stats(guild_id, user_id)
+
+    def get_many_duel_stats(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        return self._partition(guild_id).get_many_duel_stats(guild_id, user_ids)
+
+    def update_duel_stats(self, guild_id: int, user_id: int, won: bool = False):
+        return self._partition(guild_id).update_duel_stats(guild_id, user_id, won)
+
+    def record_duel_result(
+        self,
+        guild_id: int,
+        winner_id: int,
+        loser_id: int
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        return self._partition(guild_id).record_duel_result(guild_id, winner_id, loser_id)
+
+    def get_duel_leaderboard(self, guild_id: int, limit: int = 5, offset: int = 0):
+        return self._partition(guild_id).get_duel_leaderboard(guild_id, limit, offset)
+
+    def count_ranked_duelists(self, guild_id: int) -> int:
+        return self._partition(guild_id).count_ranked_duelists(guild_id)
+
+    def get_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        return self._partition(guild_id).get_rank(guild_id, user_id)
+
+    def get_user_custom_roles(self, guild_id: int, user_id: int):
+        return self._partition(guild_id).get_user_custom_roles(guild_id, user_id)
+
+    def add_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        return self._partition(guild_id).add_custom_role(guild_id, user_id, role_id)
+
+    def remove_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        return self._partition(guild_id).remove_custom_role(guild_id, user_id, role_id)
+
+    def count_user_custom_roles(self, guild_id: int, user_id: int) -> int:
+        return self._partition(guild_id).count_user_custom_roles(guild_id, user_id)
+
+    def add_scheduled_job(self, guild_id: int, kind: str, key: str, due_at: float, payload: dict) -> int:
+        return self._global_db().add_scheduled_job(guild_id, kind, key, due_at, payload)
+
+    def cancel_scheduled_job(self, guild_id: int, kind: str, key: str) -> bool:
+        return self._global_db().cancel_scheduled_job(guild_id, kind, key)
+
+    def get_scheduled_job(self, job_id: int) -> Optional[ScheduledJob]:
+        return self._global_db().get_scheduled_job(job_id)
+
+    def delete_scheduled_job(self, job_id: int):
+        return self._global_db().delete_scheduled_job(job_id)
+
+    def get_scheduled_job_times(self) -> List[Tuple[float, int, int]]:
+        return self._global_db().get_scheduled_job_times()
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Pattern
+
+import discord
+
+from utils.helpers import parse_duration
+from utils.transcript import TranscriptWriter
+
+logger = logging.getLogger("JanitorBot.purge")
+
+BULK_DELETE_BATCH = 100
+# Discord refuses to bulk delete anything older than 14 days; the margin
+# covers clock skew and a batch that takes a while to fill
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+# Pause between deletes of older messages, which can only go one at a time
+SINGLE_DELETE_INTERVAL = 1.0
+PROGRESS_INTERVAL = 3.0
+# Without an ``after`` bound, at most this many times ``amount`` messages are
+# looked at, so a narrow filter cannot walk a channel's whole history
+SCAN_MULTIPLIER = 10
+MAX_PATTERN_LENGTH = 200
+
+LINK_PATTERN = re.compile(r"https?://\S+|discord\.gg/\S+", re.IGNORECASE)
+_MESSAGE_LINK = re.compile(r"/channels/(?:\d+|@me)/\d+/(\d+)/?$")
+
+def parse_bound(value: str) -> Optional[int]:
+    """Snowflake for a purge range bound: a message ID, a message link, or a time ago (``2h``, ``3d``)"""
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+
+    match = _MESSAGE_LINK.search(value)
+    if match:
+        return int(match.group(1))
+
+    duration = parse_duration(value)
+    if duration:
+        return discord.utils.time_snowflake(discord.utils.utcnow() - duration)
+    return None
+
+class PurgeFilters(NamedTuple):
+    """Conditions a message must meet (all of them) to be purged"""
+    user_id: Optional[int] = None
+    bots: bool = False
+    links: bool = False
+    attachments: bool = False
+    pattern: Optional[Pattern[str]] = None
+
+    def matches(self, message: discord.Message) -> bool:
+        if self.user_id is not None and message.author.id != self.user_id:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.links and not LINK_PATTERN.search(message.content):
+            return False
+        if self.pattern is not None and not self.pattern.search(message.content):
+            return False
+        return True
+
+    def describe(self) -> str:
+        parts = []
+        if self.user_id is not None:
+            parts.append(f"from <@{self.user_id}>")
+        if self.bots:
+            parts.append("bots")
+        if self.links:
+            parts.append("links")
+        if self.attachments:
+            parts.append("attachments")
+        if self.pattern is not None:
+            parts.append(f"matching `{self.pattern.pattern}`")
+        return ", ".join(parts) or "none"
+
+class PurgeJob:
+    """Deletes up to ``limit`` matching messages from a channel's history.
+
+    History is read once, newest first, between the optional ``before`` and
+    ``after`` snowflakes, and every filter is checked as each message goes
+    by. Matches younger than 14 days are bulk deleted 100 at a time; older
+    ones can only be deleted one by one and are paced by
+    ``SINGLE_DELETE_INTERVAL``. Each deleted batch goes straight into the
+    transcript, if there is one.
+
+    The scan ends after ``scan_limit`` messages (None for no cap), and at
+    the first message too old to bulk delete unless ``include_old`` is set;
+    ``stop_reason`` says which limit ended it.
+
+    ``cancel`` stops the job before its next delete; a batch that was
+    collected but not yet deleted is left alone.
+    """
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        filters: PurgeFilters,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        transcript: Optional[TranscriptWriter] = None,
+        reason: Optional[str] = None,
+        scan_limit: Optional[int] = None,
+        include_old: bool = False
+    ):
+        self.channel = channel
+        self.filters = filters
+        self.limit = limit
+        self.before = before
+        self.after = after
+        self.transcript = transcript
+        self.reason = reason
+        self.scan_limit = scan_limit
+        self.include_old = include_old
+
+        self.stop_reason: Optional[str] = None
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._cancelled = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def cancel(self):
+        self._cancelled.set()
+
+    async def run(self, progress: Optional[Callable[['PurgeJob'], Awaitable[None]]] = None):
+        """Run to completion or cancellation; Forbidden propagates (missing Manage Messages)"""
+        batch: List[discord.Message] = []
+        reported_at = time.monotonic()
+
+        history = self.channel.history(
+            limit=None,
+            before=discord.Object(id=self.before) if self.before else None,
+            after=discord.Object(id=self.after) if self.after else None,
+            oldest_first=False
+        )
+        async for message in history:
+            if self.cancelled:
+                break
+            if self.scan_limit is not None and self.scanned >= self.scan_limit:
+                self.stop_reason = f"checked the newest {self.scan_limit} messages"
+                break
+            young = message.created_at >= discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+            if not young and not self.include_old:
+                # History is newest first, so nothing after this can be bulk deleted
+                self.stop_reason = "reached messages older than 14 days"
+                break
+            self.scanned += 1
+
+            if self.filters.matches(message):
+                self.matched += 1
+                if young:
+                    batch.append(message)
+                    if len(batch) == BULK_DELETE_BATCH:
+                        await self._delete_batch(batch)
+                        batch = []
+                else:
+                    # History is newest first, so everything from here on is old
+                    if batch:
+                        await self._delete_batch(batch)
+                        batch = []
+                    await self._delete_single(message)
+
+                if self.matched >= self.limit:
+                    break
+
+            if progress and time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                await progress(self)
+
+        if batch and not self.cancelled:
+            await self._delete_batch(batch)
+
+    async def _delete_batch(self, messages: List[discord.Message]):
+        if self.cancelled:
+            return
+
+        # Messages can age past the bulk delete limit while a slow scan fills the batch
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        young = [message for message in messages if message.created_at >= cutoff]
+        old = [message for message in messages if message.created_at < cutoff]
+
+        if len(young) == 1:
+            old.insert(0, young.pop())
+        if young:
+            try:
+                await self.channel.delete_messages(young, reason=self.reason)
+            except discord.NotFound:
+                # Someone else deleted one of them; retry what is left one by one
+                old = young + old
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException as e:
+                logger.warning(f"Bulk delete of {len(young)} messages in {self.channel.id} failed: {e}")
+                self.failed += len(young)
+            else:
+                self._record(young)
+
+        for message in old:
+            await self._delete_single(message)
+
+    async def _delete_single(self, message: discord.Message):
+        if self.cancelled:
+            return
+
+        try:
+            await message.delete()
+        except discord.NotFound:
+            return  # Already gone
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            logger.warning(f"Deleting message {message.id} in {self.channel.id} failed: {e}")
+            self.failed += 1
+        else:
+            self._record([message])
+
+        # Woken early by cancel()
+        try:
+            await asyncio.wait_for(self._cancelled.wait(), timeout=SINGLE_DELETE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    def _record(self, messages: List[discord.Message]):
+        self.deleted += len(messages)
+        if self.transcript is not None:
+            self.transcript.write_all(messages)
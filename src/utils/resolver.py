@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import discord
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger("JanitorBot.resolver")
+
+_MISSING = object()
+
+class UserResolver:
+    """Looks up users and members with as few REST calls as possible.
+
+    Each lookup tries discord.py's gateway cache first, then a TTL cache
+    of users and members fetched earlier, and only then asks the API.
+    "Not found" answers are cached for ``not_found_ttl`` seconds, and
+    concurrent lookups of the same ID share one in-flight request.
+
+    Fetched members are kept only ``member_ttl`` seconds: their roles and
+    nickname go stale, and discord.py sends no update event for members
+    outside its cache, so ``forget`` cannot be relied on alone.
+    """
+
+    def __init__(self, bot, maxsize: int = 4096, ttl: float = 300.0, not_found_ttl: float = 30.0,
+                 member_ttl: float = 30.0):
+        self.bot = bot
+        self.cache = TTLCache(maxsize, ttl)
+        self.not_found_ttl = not_found_ttl
+        self.member_ttl = member_ttl
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), 'inflight': len(self._inflight)}
+
+    async def get_member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """``user_id`` as a member of ``guild``, or None if they are not in it"""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+        return await self._resolve(
+            ('member', guild.id, user_id), lambda: guild.fetch_member(user_id), ttl=self.member_ttl
+        )
+
+    async def get_user(self, user_id: int) -> Optional[discord.User]:
+        """Any Discord user by ID, or None if the account does not exist"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        return await self.fetch_user(user_id)
+
+    async def fetch_user(self, user_id: int) -> Optional[discord.User]:
+        """The full profile (banner, accent color) that only the API returns"""
+        return await self._resolve(('user', user_id), lambda: self.bot.fetch_user(user_id))
+
+    def forget(self, user_id: int, guild_id: Optional[int] = None):
+        """Drop cached answers that an event (join, leave, profile or member edit) made stale"""
+        self.cache.invalidate(('user', user_id))
+        if guild_id is not None:
+            self.cache.invalidate(('member', guild_id, user_id))
+
+    async def _resolve(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: Optional[float] = None):
+        cached = self.cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key, fetch, ttl))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller timing out does not cancel the others' request
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: Optional[float]):
+        try:
+            value = await fetch()
+        except discord.NotFound:
+            self.cache.set(key, None, ttl=self.not_found_ttl)
+            return None
+
+        self.cache.set(key, value, ttl=ttl)
+        return value
@@ -0,0 +1,282 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import discord
+
+logger = logging.getLogger("JanitorBot.rest")
+
+# Lower runs first
+MODERATION, INTERACTION, COSMETIC = 0, 1, 2
+PRIORITY_NAMES = ('moderation', 'interaction', 'cosmetic')
+
+# Routes that enforce moderation; used when no command set a priority
+# (scheduled unbans, role expiry, event handlers)
+_MODERATION_ROUTES = [re.compile(pattern) for pattern in (
+    r"^(PUT|DELETE) /guilds/\{guild_id\}/bans/",
+    r"^POST /guilds/\{guild_id\}/bulk-ban",
+    r"^(PATCH|DELETE) /guilds/\{guild_id\}/members/\{user_id\}$",
+    r"^(PUT|DELETE) /guilds/\{guild_id\}/members/\{user_id\}/roles/",
+    r"^POST /channels/\{channel_id\}/messages/bulk-delete",
+    r"^DELETE /channels/\{channel_id\}/messages/\{message_id\}$",
+    r"^(PUT|DELETE) /channels/\{channel_id\}/permissions/",
+    r"^PATCH /channels/\{channel_id\}$",
+)]
+
+class RequestShed(discord.HTTPException):
+    """A low-priority request was dropped because the REST queue is overloaded.
+
+    An HTTPException, so the handlers cogs already have for failed REST
+    calls cover it too. No response exists; ``status`` is 429.
+    """
+
+    def __init__(self, message: str):
+        self.response = None
+        self.status = 429
+        self.code = 0
+        self.text = message
+        discord.DiscordException.__init__(self, message)
+
+def classify(route) -> int:
+    key = f"{route.method} {route.path}"
+    if route.path.startswith(("/interactions/", "/webhooks/{webhook_id}/{webhook_token}")):
+        return INTERACTION
+    if any(pattern.match(key) for pattern in _MODERATION_ROUTES):
+        return MODERATION
+    return COSMETIC
+
+def _bucket_key(route) -> str:
+    return f"{route.key}:{route.major_parameters}"
+
+class BucketState:
+    __slots__ = ('remaining', 'resets_at')
+
+    def __init__(self, remaining: int, resets_at: float):
+        self.remaining = remaining
+        self.resets_at = resets_at
+
+class RestScheduler:
+    """Orders outbound REST requests by priority under Discord's global limit.
+
+    Every request through the bot's HTTPClient or the interaction webhook
+    adapter first takes a token from a ``global_rate`` per second bucket.
+    When requests queue up, moderation goes first, then interaction
+    responses, then everything cosmetic. Remaining-request counts from
+    response headers are kept per route, so a request for a route known to
+    be exhausted waits for the reset before taking a token, and cosmetic
+    requests that would wait longer than ``cosmetic_max_delay`` (or arrive
+    while ``shed_queue_depth`` requests are queued) fail with RequestShed
+    instead of adding to the backlog.
+
+    Commands set their priority with ``set_priority``; otherwise the route
+    decides (bans, timeouts and deletes count as moderation).
+    """
+
+    def __init__(self, global_rate: float = 45.0, shed_queue_depth: int = 100, cosmetic_max_delay: float = 5.0):
+        self.global_rate = global_rate
+        self.shed_queue_depth = shed_queue_depth
+        self.cosmetic_max_delay = cosmetic_max_delay
+
+        self._tokens = global_rate
+        self._refilled_at: Optional[float] = None
+        # (priority, sequence, future); the sequence keeps each class FIFO
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        # Callers still waiting; the heap also holds cancelled ones until _dispatch pops them
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._dispatch_handle: Optional[asyncio.TimerHandle] = None
+
+        # "METHOD /path:major parameters" -> what the last response said
+        self._buckets: Dict[str, BucketState] = {}
+
+        self._priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('rest_priority', default=None)
+        # Route bucket and priority of the request in flight, for the trace callbacks
+        self._in_flight: contextvars.ContextVar[Optional[Tuple[str, int]]] = contextvars.ContextVar(
+            'rest_in_flight', default=None
+        )
+
+        self.sent = [0, 0, 0]
+        self.delayed = [0, 0, 0]
+        self.shed = [0, 0, 0]
+        self.rate_limited = [0, 0, 0]
+        self.global_rate_limited = 0
+
+    def set_priority(self, priority: Optional[int]):
+        """Priority for REST requests made from the current task"""
+        self._priority.set(priority)
+
+    def queue_depth(self) -> List[int]:
+        depth = [0, 0, 0]
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[priority] += 1
+        return depth
+
+    def install(self, http, webhook_adapter):
+        """Route the HTTPClient and the interaction webhook adapter through this scheduler"""
+        original_request = http.request
+
+        async def request(route, **kwargs):
+            priority = self._priority.get()
+            if priority is None:
+                priority = classify(route)
+            return await self._send(route, priority, lambda: original_request(route, **kwargs))
+
+        http.request = request
+
+        original_webhook_request = webhook_adapter.request
+
+        async def webhook_request(route, *args, **kwargs):
+            # Responses and followups never wait behind cosmetic REST calls
+            return await self._send(route, INTERACTION, lambda: original_webhook_request(route, *args, **kwargs))
+
+        webhook_adapter.request = webhook_request
+
+    async def _send(self, route, priority: int, send: Callable[[], Awaitable]):
+        await self.acquire(route, priority)
+        # Only for the duration of this request (and discord.py's retries of
+        # it), so the trace never credits a later call to this bucket
+        token = self._in_flight.set((_bucket_key(route), priority))
+        try:
+            return await send()
+        finally:
+            self._in_flight.reset(token)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Pass to the client as ``http_trace`` to read rate limit headers"""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._on_request_end)
+        return trace
+
+    async def _on_request_end(self, session, context, params: aiohttp.TraceRequestEndParams):
+        in_flight = self._in_flight.get()
+        if in_flight is None:
+            return
+
+        bucket, priority = in_flight
+        headers = params.response.headers
+        if params.response.status == 429:
+            self.rate_limited[priority] += 1
+            if headers.get('X-RateLimit-Global'):
+                self.global_rate_limited += 1
+            logger.warning(f"429 on {bucket} ({PRIORITY_NAMES[priority]})")
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is not None and reset_after is not None:
+            loop = asyncio.get_running_loop()
+            self._buckets[bucket] = BucketState(int(remaining), loop.time() + float(reset_after))
+            if len(self._buckets) > 2048:
+                self._prune_buckets(loop.time())
+
+    def _prune_buckets(self, now: float):
+        for key in [key for key, state in self._buckets.items() if state.resets_at <= now]:
+            del self._buckets[key]
+
+    def _bucket_delay(self, bucket: str, now: float) -> float:
+        state = self._buckets.get(bucket)
+        if state is None or state.remaining > 0 or state.resets_at <= now:
+            return 0.0
+        return state.resets_at - now
+
+    async def acquire(self, route, priority: int):
+        loop = asyncio.get_running_loop()
+        bucket = _bucket_key(route)
+
+        # Wait out a known-exhausted route before taking a global token, so
+        # the token goes to a request that can actually be sent
+        delay = self._bucket_delay(bucket, loop.time())
+        if delay and priority == COSMETIC and delay > self.cosmetic_max_delay:
+            self.shed[priority] += 1
+            raise RequestShed(f"{route.key} is rate limited for another {delay:.1f}s")
+        if delay:
+            self.delayed[priority] += 1
+            await asyncio.sleep(delay)
+
+        self._refill(loop.time())
+        if not self._queued and self._tokens >= 1:
+            self._tokens -= 1
+            self.sent[priority] += 1
+            return
+
+        if priority == COSMETIC and self._queued >= self.shed_queue_depth:
+            self.shed[priority] += 1
+            raise RequestShed(f"REST queue is full ({self._queued} waiting)")
+
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        self.delayed[priority] += 1
+        self._schedule_dispatch(loop)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._queued -= 1  # Left the queue before _dispatch reached it
+            raise
+        self.sent[priority] += 1
+
+    def _refill(self, now: float):
+        if self._refilled_at is not None:
+            elapsed = now - self._refilled_at
+            # At least one token of burst, or a fractional per-process rate could never send
+            self._tokens = min(max(1.0, self.global_rate), self._tokens + elapsed * self.global_rate)
+        self._refilled_at = now
+
+    def _schedule_dispatch(self, loop: asyncio.AbstractEventLoop):
+        if self._dispatch_handle is not None:
+            return
+        wait = max(0.0, (1 - self._tokens) / self.global_rate)
+        self._dispatch_handle = loop.call_later(wait, self._dispatch, loop)
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        self._dispatch_handle = None
+        self._refill(loop.time())
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # The caller was cancelled while queued
+            self._tokens -= 1
+            self._queued -= 1
+            future.set_result(None)
+
+        if self._waiters:
+            self._schedule_dispatch(loop)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        depth = self.queue_depth()
+        return {
+            name: {
+                'queued': depth[i],
+                'sent': self.sent[i],
+                'delayed': self.delayed[i],
+                'shed': self.shed[i],
+                'rate_limited': self.rate_limited[i]
+            }
+            for i, name in enumerate(PRIORITY_NAMES)
+        }
+
+    def render_prometheus(self) -> str:
+        depth = self.queue_depth()
+        lines = []
+        for metric, kind, help_text, values in (
+            ("janitor_rest_queue_depth", "gauge", "REST requests waiting for a global rate limit token", depth),
+            ("janitor_rest_sent_total", "counter", "REST requests sent", self.sent),
+            ("janitor_rest_delayed_total", "counter", "REST requests that had to wait before sending", self.delayed),
+            ("janitor_rest_shed_total", "counter", "Low-priority REST requests dropped under load", self.shed),
+            ("janitor_rest_429_total", "counter", "REST responses with status 429", self.rate_limited),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines.extend(f'{metric}{{priority="{name}"}} {values[i]}' for i, name in enumerate(PRIORITY_NAMES))
+
+        lines += [
+            "# HELP janitor_rest_global_429_total 429 responses caused by the global rate limit",
+            "# TYPE janitor_rest_global_429_total counter",
+            f"janitor_rest_global_429_total {self.global_rate_limited}",
+        ]
+        return "\n".join(lines) + "\n"
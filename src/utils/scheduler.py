@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import discord
+
+from utils.storage import ScheduledJob
+
+logger = logging.getLogger("JanitorBot.scheduler")
+
+JobHandler = Callable[[ScheduledJob], Awaitable[None]]
+
+# A failing handler is retried after 30s, 60s, 120s... before the job is dropped
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = 30.0
+
+class Scheduler:
+    """Runs delayed jobs (unbans, role removals, duel timeouts) at their due time.
+
+    Jobs are stored through the database, so they survive restarts. In
+    memory only a min-heap of ``(due_at, job_id)`` is kept, and a single
+    task sleeps until the earliest one is due; the job itself is read back
+    when it runs. Cancelling or rescheduling only touches the database:
+    the stale heap entry finds no job (or a new ID) and is skipped.
+
+    A handler that raises is retried with exponential backoff, up to
+    ``MAX_ATTEMPTS`` runs; NotFound counts as done.
+
+    ``owns(guild_id)`` limits a process to its own guilds when launcher.py
+    runs several of them against the same database.
+    """
+
+    def __init__(
+        self,
+        db,
+        owns: Optional[Callable[[int], bool]] = None,
+        wait_ready: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.db = db
+        self.owns = owns or (lambda guild_id: True)
+        self.wait_ready = wait_ready
+        self.handlers: Dict[str, JobHandler] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Handlers run as their own tasks so a slow REST call never delays other jobs
+        self._running: Set[asyncio.Task] = set()
+        # job ID -> failed runs so far; a restart starts the count over
+        self._attempts: Dict[int, int] = {}
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    def unregister(self, kind: str):
+        self.handlers.pop(kind, None)
+
+    @property
+    def pending(self) -> int:
+        """Heap entries, including ones cancelled since startup"""
+        return len(self._heap)
+
+    async def start(self):
+        """Load pending jobs for this process's guilds and start the wake-up task"""
+        times = await self.db.get_scheduled_job_times()
+        self._heap = [(due_at, job_id) for due_at, job_id, guild_id in times if self.owns(guild_id)]
+        heapq.heapify(self._heap)
+        if self._heap:
+            logger.info(f"Restored {len(self._heap)} scheduled job(s)")
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        # Interrupted jobs are still in the database and run again after a restart
+        for task in list(self._running):
+            task.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def schedule(
+        self,
+        guild_id: int,
+        kind: str,
+        key: Union[int, str],
+        when: Union[datetime, timedelta, float],
+        **payload
+    ) -> int:
+        """Run the ``kind`` handler at ``when`` (a datetime, a delay, or Unix time).
+
+        A pending job with the same guild, kind and key is replaced.
+        """
+        if isinstance(when, timedelta):
+            due_at = time.time() + when.total_seconds()
+        elif isinstance(when, datetime):
+            due_at = when.timestamp()
+        else:
+            due_at = float(when)
+
+        job_id = await self.db.add_scheduled_job(guild_id, kind, str(key), due_at, payload)
+        heapq.heappush(self._heap, (due_at, job_id))
+        if self._heap[0][1] == job_id:
+            self._wake.set()
+        return job_id
+
+    async def cancel(self, guild_id: int, kind: str, key: Union[int, str]) -> bool:
+        return await self.db.cancel_scheduled_job(guild_id, kind, str(key))
+
+    async def _run(self):
+        if self.wait_ready:
+            await self.wait_ready()
+
+        while True:
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+
+            due_at, job_id = self._heap[0]
+            delay = due_at - time.time()
+            if delay > 0:
+                # Woken early when a sooner job is scheduled
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+
+            heapq.heappop(self._heap)
+            try:
+                job = await self.db.get_scheduled_job(job_id)
+            except Exception as e:
+                logger.error(f"Could not load scheduled job {job_id}, retrying in 30s: {e}")
+                heapq.heappush(self._heap, (time.time() + 30, job_id))
+                continue
+
+            if job is None:
+                self._attempts.pop(job_id, None)
+                continue  # Cancelled or replaced
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: ScheduledJob):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            # Left in the database; picked up again at the next start
+            logger.warning(f"No handler for scheduled {job.kind} job {job.id}; keeping it until restart")
+            return
+
+        try:
+            await handler(job)
+        except discord.NotFound:
+            pass  # The ban, member or role is already gone; nothing left to undo
+        except Exception as e:
+            attempts = self._attempts.get(job.id, 0) + 1
+            if attempts < MAX_ATTEMPTS:
+                # The row stays in the database, so a restart also retries it
+                self._attempts[job.id] = attempts
+                delay = RETRY_BASE_DELAY * 2 ** (attempts - 1)
+                logger.warning(
+                    f"Scheduled {job.kind} job {job.id} (guild {job.guild_id}) failed, "
+                    f"retrying in {delay:.0f}s ({attempts}/{MAX_ATTEMPTS}): {e}"
+                )
+                heapq.heappush(self._heap, (time.time() + delay, job.id))
+                self._wake.set()
+                return
+            logger.error(
+                f"Scheduled {job.kind} job {job.id} (guild {job.guild_id}) failed {attempts} times, giving up: {e}"
+            )
+
+        self._attempts.pop(job.id, None)
+        try:
+            await self.db.delete_scheduled_job(job.id)
+        except Exception as e:
+            logger.error(f"Could not delete scheduled job {job.id}: {e}")
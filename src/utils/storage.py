@@ -0,0 +1,137 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+class ScheduledJob(NamedTuple):
+    id: int
+    guild_id: int
+    kind: str
+    key: str
+    due_at: float
+    payload: dict
+
+class StorageBackend(ABC):
+    """Operations the cogs need from persistent storage.
+
+    Implementations are synchronous; the bot always wraps them in
+    AsyncDatabase, which runs them on its worker thread. Duel and role
+    methods are scoped by guild; scheduled jobs are looked up by ID so the
+    scheduler can load every pending job at startup.
+    """
+
+    @abstractmethod
+    def get_duel_stats(self, guild_id: int, user_id: int) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def get_many_duel_stats(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        ...
+
+    @abstractmethod
+    def update_duel_stats(self, guild_id: int, user_id: int, won: bool = False):
+        ...
+
+    @abstractmethod
+    def record_duel_result(
+        self,
+        guild_id: int,
+        winner_id: int,
+        loser_id: int
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        ...
+
+    @abstractmethod
+    def get_duel_leaderboard(self, guild_id: int, limit: int = 5, offset: int = 0) -> List[Tuple[int, int, int]]:
+        ...
+
+    @abstractmethod
+    def count_ranked_duelists(self, guild_id: int) -> int:
+        ...
+
+    @abstractmethod
+    def get_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def get_user_custom_roles(self, guild_id: int, user_id: int) -> List[Tuple[int, int]]:
+        ...
+
+    @abstractmethod
+    def add_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        ...
+
+    @abstractmethod
+    def remove_custom_role(self, guild_id: int, user_id: int, role_id: int):
+        ...
+
+    @abstractmethod
+    def count_user_custom_roles(self, guild_id: int, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    def add_scheduled_job(self, guild_id: int, kind: str, key: str, due_at: float, payload: dict) -> int:
+        """Store a job due at ``due_at`` (Unix time), replacing any with the same key"""
+
+    @abstractmethod
+    def cancel_scheduled_job(self, guild_id: int, kind: str, key: str) -> bool:
+        """Remove a pending job; False if there was none"""
+
+    @abstractmethod
+    def get_scheduled_job(self, job_id: int) -> Optional[ScheduledJob]:
+        ...
+
+    @abstractmethod
+    def delete_scheduled_job(self, job_id: int):
+        ...
+
+    @abstractmethod
+    def get_scheduled_job_times(self) -> List[Tuple[float, int, int]]:
+        """(due_at, job_id, guild_id) for every pending job, soonest first"""
+
+    def flush(self):
+        """Write out anything buffered in memory"""
+
+    def close(self):
+        """Flush and release resources"""
+
+    def database_files(self) -> List[Path]:
+        """Files a backup should copy; empty for non-file backends"""
+        return []
+
+    @property
+    def maintenance_interval(self) -> Optional[float]:
+        """How often run_maintenance needs to be called, or None if never"""
+        return None
+
+    def run_maintenance(self):
+        """Periodic housekeeping, called from the database worker thread"""
+
+def open_storage(config) -> StorageBackend:
+    """Build the storage backend selected by ``database.backend`` in config.json"""
+    # Imported here because the backends import StorageBackend from this module
+    from utils.database import Database
+    from utils.memory_storage import MemoryStorage
+    from utils.partitioned_database import GuildPartitionedDatabase
+
+    backend = config.database_backend
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown database backend: {backend}")
+
+    options = {
+        'synchronous': config.database_synchronous,
+        'write_behind': config.database_write_behind,
+        'flush_interval_ms': config.database_flush_interval_ms,
+        'flush_max_ops': config.database_flush_max_ops
+    }
+
+    if config.database_per_guild_files:
+        return GuildPartitionedDatabase(
+            config.database_guild_directory,
+            max_open=config.database_max_open_guilds,
+            idle_seconds=config.database_guild_idle_seconds,
+            **options
+        )
+
+    return Database(config.database_path, **options)
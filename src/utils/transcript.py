@@ -0,0 +1,112 @@
+import gzip
+import tempfile
+from typing import IO, Iterable, List, Tuple
+
+import discord
+
+# Compressed bytes written between size checks; also the headroom kept below
+# the limit, since that much may still be buffered inside the compressor
+FLUSH_EVERY = 64 * 1024
+
+# Headroom for the multipart envelope around each uploaded file
+UPLOAD_OVERHEAD = 16 * 1024
+
+class TranscriptError(Exception):
+    """The transcript's temporary file could not be written"""
+
+def format_message(message: discord.Message) -> str:
+    """One transcript entry: time, message ID, author, content, then one line per attachment"""
+    lines = [
+        f"[{message.created_at.strftime('%Y-%m-%d %H:%M:%S')}] ({message.id}) "
+        f"{message.author.display_name} ({message.author.id}): {message.clean_content}"
+    ]
+    lines.extend(f"    attachment: {attachment.url}" for attachment in message.attachments)
+    if message.embeds:
+        lines.append(f"    embeds: {len(message.embeds)}")
+    return "\n".join(lines) + "\n"
+
+class TranscriptWriter:
+    """Gzip-compressed transcript written to disk as messages come in.
+
+    Entries go straight into a compressor backed by a temporary file, so
+    memory use does not grow with the size of the purge. When a part gets
+    close to ``max_part_size`` compressed bytes it is closed and a new one
+    started; ``finish`` returns every part ready for upload.
+    """
+
+    def __init__(self, filename: str, max_part_size: int, header: str = ""):
+        self.filename = filename
+        self.max_part_size = max(FLUSH_EVERY * 2, max_part_size - UPLOAD_OVERHEAD)
+        self.header = header
+        self.count = 0
+        self._parts: List[IO[bytes]] = []
+        self._file: IO[bytes] = None
+        self._gzip: gzip.GzipFile = None
+        self._unflushed = 0
+        try:
+            self._open_part()
+        except OSError as e:
+            raise TranscriptError(str(e)) from e
+
+    def _open_part(self):
+        self._file = tempfile.TemporaryFile()
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb')
+        self._unflushed = 0
+        if self.header:
+            self._write(self.header + "\n")
+
+    def _close_part(self):
+        self._gzip.close()
+        self._file.seek(0)
+        self._parts.append(self._file)
+
+    def _write(self, text: str):
+        data = text.encode('utf-8')
+        self._gzip.write(data)
+        self._unflushed += len(data)
+
+    def write(self, message: discord.Message):
+        entry = format_message(message)
+        self.count += 1
+
+        try:
+            if self._unflushed >= FLUSH_EVERY:
+                # Push buffered data through so tell() reflects what is on disk
+                self._gzip.flush()
+                self._unflushed = 0
+                if self._file.tell() + FLUSH_EVERY >= self.max_part_size:
+                    self._close_part()
+                    self._open_part()
+            self._write(entry)
+        except OSError as e:
+            raise TranscriptError(str(e)) from e
+
+    def write_all(self, messages: Iterable[discord.Message]):
+        for message in messages:
+            self.write(message)
+
+    def finish(self) -> List[Tuple[IO[bytes], str]]:
+        """Close the last part and return ``(file, filename)`` for each part"""
+        try:
+            self._close_part()
+        except OSError as e:
+            raise TranscriptError(str(e)) from e
+        if len(self._parts) == 1:
+            return [(self._parts[0], f"{self.filename}.txt.gz")]
+        return [
+            (part, f"{self.filename}_part{i}of{len(self._parts)}.txt.gz")
+            for i, part in enumerate(self._parts, 1)
+        ]
+
+    def close(self):
+        """Delete the temporary files, finished or not"""
+        if self._file is not None and self._file not in self._parts:
+            try:
+                self._gzip.close()
+            except OSError:
+                pass  # The unfinished part is discarded either way
+            self._file.close()
+        for part in self._parts:
+            part.close()
+        self._parts = []
+        self._file = None